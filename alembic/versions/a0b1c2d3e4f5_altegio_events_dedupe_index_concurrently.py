@@ -0,0 +1,88 @@
+"""altegio_events: make the dedupe_key index unique without blocking writes
+
+Revision ID: a0b1c2d3e4f5
+Revises: f9a0b1c2d3e4
+Create Date: 2026-10-16 00:00:00.000000
+
+The webhook inserts with ON CONFLICT (dedupe_key), which needs a valid
+unique index.  2c24d34e45e2 creates one in the migration's transaction;
+this revision repairs databases where ix_altegio_events_dedupe_key is
+missing, not unique, or left INVALID by an interrupted CONCURRENTLY
+build.
+
+The new index is built CONCURRENTLY under a temporary name and then
+swapped in, so altegio_events stays writable.  Every step is safe to
+re-run after a partial run.  With a valid unique index in place the
+revision only removes a leftover temporary index, if any.
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision: str = "a0b1c2d3e4f5"
+down_revision: Union[str, Sequence[str], None] = "f9a0b1c2d3e4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_INDEX = "ix_altegio_events_dedupe_key"
+_TMP_INDEX = f"{_INDEX}_new"
+
+
+def _index_state(index_name: str) -> tuple[bool, bool] | None:
+    """(unique, valid) для индекса или None, если его нет."""
+    row = (
+        op.get_bind()
+        .execute(
+            sa.text(
+                "select i.indisunique, i.indisvalid from pg_index i "
+                "join pg_class c on c.oid = i.indexrelid "
+                "where c.relname = :name"
+            ),
+            {"name": index_name},
+        )
+        .first()
+    )
+    return None if row is None else (row[0], row[1])
+
+
+def _drop_index(index_name: str) -> None:
+    op.drop_index(
+        index_name,
+        table_name="altegio_events",
+        postgresql_concurrently=True,
+        if_exists=True,
+    )
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        if _index_state(_INDEX) == (True, True):
+            # Уже уникальный и валидный — убираем хвост прерванного запуска.
+            _drop_index(_TMP_INDEX)
+            return
+
+        # Прерванная сборка CONCURRENTLY оставляет INVALID-индекс,
+        # который IF NOT EXISTS посчитал бы готовым.
+        tmp = _index_state(_TMP_INDEX)
+        if tmp is not None and not tmp[1]:
+            _drop_index(_TMP_INDEX)
+
+        op.create_index(
+            _TMP_INDEX,
+            "altegio_events",
+            ["dedupe_key"],
+            unique=True,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        _drop_index(_INDEX)
+
+    op.execute(f"alter index {_TMP_INDEX} rename to {_INDEX}")
+
+
+def downgrade() -> None:
+    # Уникальность dedupe_key нужна с 2c24d34e45e2 — откатывать нечего.
+    pass
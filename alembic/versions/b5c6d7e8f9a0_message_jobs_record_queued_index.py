@@ -0,0 +1,46 @@
+"""message_jobs: partial index for canceling a record's queued jobs
+
+Revision ID: b5c6d7e8f9a0
+Revises: a3b4c5d6e7f8
+Create Date: 2026-10-16 00:00:00.000000
+
+The planner cancels a record's queued jobs on every update/delete event
+(WHERE record_id = ? AND job_type IN (...) AND status = 'queued').
+A partial index over queued rows only keeps that lookup independent of
+the record's job history.
+
+Built CONCURRENTLY — message_jobs stays writable during the build.
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision: str = "b5c6d7e8f9a0"
+down_revision: Union[str, Sequence[str], None] = "a3b4c5d6e7f8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_msgjob_record_queued",
+            "message_jobs",
+            ["record_id", "job_type"],
+            postgresql_where=sa.text("status = 'queued'"),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_msgjob_record_queued",
+            table_name="message_jobs",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
@@ -0,0 +1,46 @@
+"""message_jobs: partial index for picking up due queued jobs
+
+Revision ID: c6d7e8f9a0b1
+Revises: b5c6d7e8f9a0
+Create Date: 2026-10-16 00:00:00.000000
+
+The outbox worker polls WHERE status = 'queued' AND run_at <= now()
+ORDER BY run_at.  ix_message_jobs_status_run_at also carries every
+sent/canceled/failed job, so it keeps growing with the history; a
+partial index over queued rows stays as small as the live queue.
+
+Built CONCURRENTLY — message_jobs stays writable during the build.
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision: str = "c6d7e8f9a0b1"
+down_revision: Union[str, Sequence[str], None] = "b5c6d7e8f9a0"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_message_jobs_queued_run_at",
+            "message_jobs",
+            ["run_at"],
+            postgresql_where=sa.text("status = 'queued'"),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_message_jobs_queued_run_at",
+            table_name="message_jobs",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
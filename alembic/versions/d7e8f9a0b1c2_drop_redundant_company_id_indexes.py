@@ -0,0 +1,47 @@
+"""drop single-column company_id indexes covered by unique constraints
+
+Revision ID: d7e8f9a0b1c2
+Revises: c6d7e8f9a0b1
+Create Date: 2026-10-16 00:00:00.000000
+
+clients, records, whatsapp_senders and service_sender_rules each have a
+UNIQUE (company_id, ...) constraint whose index already serves
+company_id lookups, so the separate ix_<table>_company_id indexes only
+add write and WAL cost.
+
+Dropped CONCURRENTLY — the tables stay writable.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "d7e8f9a0b1c2"
+down_revision: Union[str, Sequence[str], None] = "c6d7e8f9a0b1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_TABLES = ("clients", "records", "whatsapp_senders", "service_sender_rules")
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for table in _TABLES:
+            op.drop_index(
+                f"ix_{table}_company_id",
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for table in _TABLES:
+            op.create_index(
+                f"ix_{table}_company_id",
+                table,
+                ["company_id"],
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
@@ -0,0 +1,79 @@
+"""whatsapp_events: build missing indexes concurrently
+
+Revision ID: e8f9a0b1c2d3
+Revises: d7e8f9a0b1c2
+Create Date: 2026-10-16 00:00:00.000000
+
+2c24d34e45e2 creates the whatsapp_events indexes only together with the
+table, in the migration's transaction.  On a database where the table
+already existed, or where an index was dropped by hand, some of them may
+be missing.  This revision builds any missing one CONCURRENTLY, so
+webhook writes are not blocked; on a database that ran 2c24d34e45e2
+normally it finds nothing to do.
+
+An index left INVALID by an interrupted CONCURRENTLY build is dropped
+and rebuilt, since IF NOT EXISTS would take it for a finished one.
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision: str = "e8f9a0b1c2d3"
+down_revision: Union[str, Sequence[str], None] = "d7e8f9a0b1c2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (колонка, unique) — те же индексы, что создаёт 2c24d34e45e2.
+_INDEXES = (
+    ("dedupe_key", True),
+    ("received_at", False),
+    ("status", False),
+    ("company_id", False),
+    ("resource", False),
+    ("resource_id", False),
+    ("event_status", False),
+)
+
+
+def _index_is_invalid(index_name: str) -> bool:
+    return bool(
+        op.get_bind()
+        .execute(
+            sa.text(
+                "select 1 from pg_index i "
+                "join pg_class c on c.oid = i.indexrelid "
+                "where c.relname = :name and not i.indisvalid"
+            ),
+            {"name": index_name},
+        )
+        .scalar()
+    )
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for column, unique in _INDEXES:
+            index_name = f"ix_whatsapp_events_{column}"
+            if _index_is_invalid(index_name):
+                op.drop_index(
+                    index_name,
+                    table_name="whatsapp_events",
+                    postgresql_concurrently=True,
+                    if_exists=True,
+                )
+            op.create_index(
+                index_name,
+                "whatsapp_events",
+                [column],
+                unique=unique,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    # Индексы принадлежат 2c24d34e45e2 — откат этой ревизии их не трогает.
+    pass
@@ -0,0 +1,50 @@
+"""altegio_events: delete duplicate dedupe keys in batches
+
+Revision ID: f9a0b1c2d3e4
+Revises: e8f9a0b1c2d3
+Create Date: 2026-10-16 00:00:00.000000
+
+2c24d34e45e2 removes duplicate dedupe keys with one DELETE in the
+migration's transaction, which holds row locks on the whole history of
+altegio_events until it commits.  This revision repeats the cleanup for
+databases where duplicates slipped in after that (for example, the
+unique index was dropped by hand) and deletes them in batches: each
+batch is its own statement in autocommit mode, so locks are released
+after every batch.  No DO block with COMMIT is needed, which would only
+work outside a transaction.
+
+On a database with a valid unique index the first batch deletes nothing.
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision: str = "f9a0b1c2d3e4"
+down_revision: Union[str, Sequence[str], None] = "e8f9a0b1c2d3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Сколько дублей удалять одним DELETE.
+_BATCH = 10000
+
+_DELETE_DUPLICATES = sa.text(
+    "delete from altegio_events where id in ("
+    "select a.id from altegio_events a "
+    "join altegio_events b on a.dedupe_key = b.dedupe_key and a.id > b.id "
+    "limit :batch)"
+)
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        while bind.execute(_DELETE_DUPLICATES, {"batch": _BATCH}).rowcount:
+            pass
+
+
+def downgrade() -> None:
+    # Удалённые дубли не восстановить — откатывать нечего.
+    pass
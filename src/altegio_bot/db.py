@@ -1,10 +1,53 @@
+import asyncio
+import logging
+
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 
 from .settings import settings
 
+logger = logging.getLogger("altegio_db")
+
 engine: AsyncEngine = create_async_engine(
     settings.database_url,
-    pool_pre_ping=True,
+    pool_pre_ping=settings.db_pool_pre_ping,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout,
+    pool_recycle=1800,
+    connect_args={
+        # Кэш подготовленных запросов asyncpg и SQLAlchemy: вебхук и
+        # планировщик гоняют одни и те же запросы тысячи раз.
+        "statement_cache_size": 1024,
+        "prepared_statement_cache_size": 1024,
+        # JIT на коротких OLTP-запросах только добавляет задержку.
+        "server_settings": {"jit": "off"},
+    },
 )
 
 SessionLocal = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+
+async def warm_up_pool(size: int = settings.db_pool_size) -> None:
+    """Заранее открыть size соединений, чтобы первые запросы не ждали connect.
+
+    Это только оптимизация: если БД недоступна, пишем предупреждение и
+    стартуем как раньше — соединения откроются лениво.
+    """
+    results = await asyncio.gather(*(engine.connect() for _ in range(size)), return_exceptions=True)
+    conns = [r for r in results if not isinstance(r, BaseException)]
+    errors = [r for r in results if isinstance(r, BaseException)]
+    try:
+        checks = await asyncio.gather(*(conn.execute(text("SELECT 1")) for conn in conns), return_exceptions=True)
+        errors += [r for r in checks if isinstance(r, BaseException)]
+    finally:
+        # Открывшиеся соединения возвращаем в пул в любом случае.
+        await asyncio.gather(*(conn.close() for conn in conns), return_exceptions=True)
+
+    if errors:
+        logger.warning(
+            "DB pool warm-up failed for %d of %d connections",
+            len(errors),
+            size,
+            exc_info=errors[0],
+        )
@@ -1,12 +1,18 @@
 from __future__ import annotations
 
+import json
 import logging
+from collections.abc import Callable
 from datetime import datetime, timedelta, timezone
-from typing import Any
+from typing import Any, NamedTuple
 
-from sqlalchemy import func, or_, select, update
+from sqlalchemy import BigInteger, DateTime, Integer, String, Text, Update, bindparam, cast, func, or_, select, update
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, Insert
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from sqlalchemy.sql.elements import ColumnElement
+from sqlalchemy.sql.selectable import TableValuedAlias
 
 from altegio_bot.altegio_records import count_attended_client_visits
 from altegio_bot.db import SessionLocal  # noqa: F401 – re-exported
@@ -21,9 +27,13 @@ RECORD_CANCELED = "record_canceled"
 
 REMINDER_24H = "reminder_24h"
 REMINDER_2H = "reminder_2h"
+REMINDER_24H_LEAD = timedelta(hours=24)
+REMINDER_2H_LEAD = timedelta(hours=2)
 
 REVIEW_3D = "review_3d"
+REVIEW_3D_DELAY = timedelta(days=3)
 REPEAT_10D = "repeat_10d"
+REPEAT_10D_DELAY = timedelta(days=10)
 COMEBACK_3D = "comeback_3d"
 COMEBACK_3D_DELAY = timedelta(days=3)
 COMEBACK_3D_SOURCE_CANCELLED_AT_KEY = "source_cancelled_at"
@@ -45,6 +55,29 @@ MARKETING_JOB_TYPES = (
     COMEBACK_3D,
 )
 
+REMINDER_JOB_TYPES = (
+    REMINDER_24H,
+    REMINDER_2H,
+)
+
+# Statuses of jobs that planning the same dedupe_key again requeues.
+REQUEUE_STATUSES = ("canceled", "failed")
+
+# Columns sent to Postgres as one array parameter each (see
+# _insert_jobs_from_arrays).  status/last_error/locked_at fall back to the
+# column defaults for fresh rows.  payload goes over the wire as a
+# text[] of JSON documents: asyncpg does not encode dicts inside a
+# jsonb[] parameter.
+_JOB_ARRAY_COLUMNS = (
+    ("company_id", Integer()),
+    ("record_id", BigInteger()),
+    ("client_id", BigInteger()),
+    ("job_type", String()),
+    ("run_at", DateTime(timezone=True)),
+    ("dedupe_key", String()),
+    ("payload", Text()),
+)
+
 # Maximum attended visits a client may have and still receive a review
 # request.  Clients above this threshold are considered experienced
 # and do not need a prompt.
@@ -95,34 +128,194 @@ def make_dedupe_key(
     record_id: int | None,
     run_at: datetime,
 ) -> str:
-    rid = int(record_id) if record_id is not None else 0
+    """Stable idempotency key of a job.
+
+    The format is part of the stored data: rows already in
+    message_jobs, and the campaign code that rebuilds keys to find its
+    jobs, rely on ``run_at.isoformat()``.  Changing it (e.g. to epoch
+    seconds) would make re-planned jobs miss their existing rows and
+    queue duplicates.
+    """
+    rid = 0 if record_id is None else record_id
     return f"{job_type}:{company_id}:{rid}:{run_at.isoformat()}"
 
 
-async def cancel_queued_jobs(
-    session: AsyncSession,
+def _cancel_queued_stmt(
     *,
     company_id: int,
     record_id: int,
     reason: str,
-) -> int:
+    now: datetime,
+    job_types: tuple[str, ...] = SYSTEM_JOB_TYPES,
+    keep_dedupe_keys: list[str] | None = None,
+) -> Update:
     stmt = (
         update(MessageJob)
         .where(MessageJob.company_id == company_id)
         .where(MessageJob.record_id == record_id)
-        .where(MessageJob.job_type.in_(SYSTEM_JOB_TYPES))
+        .where(MessageJob.job_type.in_(job_types))
         .where(MessageJob.status == "queued")
         .values(
             status="canceled",
-            updated_at=utcnow(),
+            updated_at=now,
             last_error=reason,
             locked_at=None,
         )
     )
+    if keep_dedupe_keys:
+        stmt = stmt.where(MessageJob.dedupe_key.not_in(keep_dedupe_keys))
+    return stmt
+
+
+async def cancel_queued_jobs(
+    session: AsyncSession,
+    *,
+    company_id: int,
+    record_id: int,
+    reason: str,
+    job_types: tuple[str, ...] = SYSTEM_JOB_TYPES,
+) -> int:
+    """Cancel the record's queued jobs of ``job_types``; return the count.
+
+    Pass a module-level tuple such as SYSTEM_JOB_TYPES or
+    REMINDER_JOB_TYPES: SQLAlchemy renders the IN list as one expanding
+    bind parameter, so every call reuses the same cached compiled
+    statement regardless of the tuple's contents.
+    """
+    stmt = _cancel_queued_stmt(
+        company_id=company_id,
+        record_id=record_id,
+        reason=reason,
+        now=utcnow(),
+        job_types=job_types,
+    )
     res = await session.execute(stmt)
     return int(getattr(res, "rowcount", 0) or 0)
 
 
+def build_job_row(
+    *,
+    company_id: int,
+    record_id: int | None,
+    client_id: int | None,
+    job_type: str,
+    run_at: datetime,
+    payload: dict[str, Any],
+) -> dict[str, Any]:
+    """Column values for one queued MessageJob, ready for add_jobs()."""
+    return {
+        "company_id": company_id,
+        "record_id": record_id,
+        "client_id": client_id,
+        "job_type": job_type,
+        "run_at": run_at,
+        "status": "queued",
+        "last_error": None,
+        "dedupe_key": make_dedupe_key(
+            job_type=job_type,
+            company_id=company_id,
+            record_id=record_id,
+            run_at=run_at,
+        ),
+        "payload": payload,
+        "locked_at": None,
+    }
+
+
+def _job_arrays(rows: list[dict[str, Any]]) -> dict[str, list[Any]]:
+    columns: dict[str, list[Any]] = {name: [] for name, _ in _JOB_ARRAY_COLUMNS}
+    for row in rows:
+        for name, values in columns.items():
+            values.append(row[name])
+    columns["payload"] = [json.dumps(payload) for payload in columns["payload"]]
+    return columns
+
+
+def _insert_jobs_from_arrays(
+    rows: list[dict[str, Any]],
+    *,
+    row_filter: Callable[[TableValuedAlias], ColumnElement[bool]] | None = None,
+) -> Insert:
+    """INSERT ... SELECT FROM unnest(...) for ``rows``, no conflict clause.
+
+    Every column travels as a single typed array, so the SQL text and
+    bind parameters are identical for any number of rows and one
+    prepared statement serves every call.  ``row_filter`` builds a
+    WHERE clause over the unnested rows to drop some of them in SQL.
+    """
+    columns = _job_arrays(rows)
+    arrays = [cast(bindparam(name, columns[name]), ARRAY(type_)) for name, type_ in _JOB_ARRAY_COLUMNS]
+    jobs = func.unnest(*arrays).table_valued(*columns).render_derived(name="jobs")
+    selected = [jobs.c[name] for name in columns]
+    selected[-1] = cast(jobs.c.payload, JSONB)
+    source = select(*selected)
+    if row_filter is not None:
+        source = source.where(row_filter(jobs))
+    return pg_insert(MessageJob).from_select(list(columns), source)
+
+
+def _insert_jobs_stmt(rows: list[dict[str, Any]]) -> Insert:
+    """Insert ``rows``, skipping taken dedupe keys; returns inserted keys."""
+    return (
+        _insert_jobs_from_arrays(rows)
+        .on_conflict_do_nothing(index_elements=[MessageJob.dedupe_key])
+        .returning(MessageJob.dedupe_key)
+    )
+
+
+def _revive_jobs_stmt(
+    rows: list[dict[str, Any]],
+    *,
+    now: datetime,
+    where: ColumnElement[bool] | None = None,
+) -> Update:
+    """Requeue canceled/failed jobs whose dedupe_key is planned again.
+
+    The bind names differ from _insert_jobs_from_arrays() so both can
+    share one statement.  ``where`` further restricts the jobs revived.
+    """
+    revived = (
+        func.unnest(
+            cast(bindparam("revive_dedupe_key", [row["dedupe_key"] for row in rows]), ARRAY(String())),
+            cast(bindparam("revive_payload", [json.dumps(row["payload"]) for row in rows]), ARRAY(Text())),
+        )
+        .table_valued("dedupe_key", "payload")
+        .render_derived(name="revived")
+    )
+    stmt = (
+        update(MessageJob)
+        .where(MessageJob.dedupe_key == revived.c.dedupe_key)
+        .where(MessageJob.status.in_(REQUEUE_STATUSES))
+        .values(
+            status="queued",
+            last_error=None,
+            locked_at=None,
+            payload=cast(revived.c.payload, JSONB),
+            updated_at=now,
+        )
+    )
+    if where is not None:
+        stmt = stmt.where(where)
+    return stmt
+
+
+async def add_jobs(session: AsyncSession, rows: list[dict[str, Any]]) -> None:
+    """Upsert many jobs built by build_job_row().
+
+    New jobs are inserted with one statement; jobs whose dedupe_key is
+    already taken by a canceled or failed job are requeued by a second
+    one, issued only when such conflicts exist.
+    """
+    if not rows:
+        return
+    # Usually every key is new and the INSERT ... DO NOTHING is all we
+    # send; the UPDATE only runs for rows that already existed.
+    inserted = set((await session.execute(_insert_jobs_stmt(rows))).scalars())
+    existing = [row for row in rows if row["dedupe_key"] not in inserted]
+    if existing:
+        await session.execute(_revive_jobs_stmt(existing, now=utcnow()))
+
+
 async def add_job(
     session: AsyncSession,
     *,
@@ -133,37 +326,86 @@ async def add_job(
     run_at: datetime,
     payload: dict[str, Any],
 ) -> None:
-    dedupe_key = make_dedupe_key(
-        job_type=job_type,
-        company_id=company_id,
-        record_id=record_id,
-        run_at=run_at,
-    )
-
-    stmt = pg_insert(MessageJob).values(
+    row = build_job_row(
         company_id=company_id,
         record_id=record_id,
         client_id=client_id,
         job_type=job_type,
         run_at=run_at,
-        status="queued",
-        last_error=None,
-        dedupe_key=dedupe_key,
         payload=payload,
-        locked_at=None,
     )
+    await add_jobs(session, [row])
+
 
-    stmt = stmt.on_conflict_do_update(
-        index_elements=[MessageJob.dedupe_key],
-        set_={
-            "status": "queued",
-            "last_error": None,
-            "locked_at": None,
-            "payload": stmt.excluded.payload,
-            "updated_at": utcnow(),
-        },
-        where=MessageJob.status.in_(("canceled", "failed")),
+async def _write_record_jobs(
+    session: AsyncSession,
+    *,
+    company_id: int,
+    record_id: int,
+    rows: list[dict[str, Any]],
+    cancel_reason: str | None,
+    now: datetime,
+    comeback_client_id: int | None = None,
+) -> None:
+    """Write all jobs planned for one record event in a single statement.
+
+    Unlike add_jobs(), conflicts are the norm here: an update event
+    re-plans the reminders it queued last time.  The INSERT ... DO
+    NOTHING and the requeue of canceled/failed keys therefore go out
+    together, the requeue as a data-modifying CTE, keeping the event at
+    one round trip.  Conflicts with still-queued jobs cost nothing: DO
+    NOTHING neither evaluates an UPDATE nor locks the existing row.
+
+    When ``cancel_reason`` is set, the cancellation of the record's
+    queued system jobs is attached as another CTE.
+
+    Jobs whose dedupe_key is being re-planned are left out of the
+    cancel: Postgres does not define which change wins when one
+    statement updates the same row twice.  Previously such rows were
+    canceled and then revived, so skipping both steps leaves them in
+    the same queued state.  The requeue only touches canceled/failed
+    rows, so it never overlaps with the cancel either.
+
+    With ``comeback_client_id`` set, a planned comeback_3d row is dropped
+    inside the statement when that client already has a queued comeback
+    from another record.  This record's own jobs do not count: they are
+    being canceled by this very event.
+    """
+    row_filter = None
+    revive_where = None
+    if comeback_client_id is not None:
+        # Aliased so the subquery is not correlated with the requeue
+        # UPDATE of message_jobs.
+        other = aliased(MessageJob)
+        already_queued = (
+            select(other.id)
+            .where(other.company_id == company_id)
+            .where(other.client_id == comeback_client_id)
+            .where(other.job_type == COMEBACK_3D)
+            .where(other.status == "queued")
+            .where(or_(other.record_id.is_(None), other.record_id != record_id))
+            .exists()
+        )
+
+        def row_filter(jobs: TableValuedAlias) -> ColumnElement[bool]:
+            return or_(jobs.c.job_type != COMEBACK_3D, ~already_queued)
+
+        revive_where = or_(MessageJob.job_type != COMEBACK_3D, ~already_queued)
+
+    stmt = _insert_jobs_from_arrays(rows, row_filter=row_filter).on_conflict_do_nothing(
+        index_elements=[MessageJob.dedupe_key]
     )
+    revive = _revive_jobs_stmt(rows, now=now, where=revive_where)
+    stmt = stmt.add_cte(revive.returning(MessageJob.id).cte("revived_jobs"))
+    if cancel_reason is not None:
+        cancel = _cancel_queued_stmt(
+            company_id=company_id,
+            record_id=record_id,
+            reason=cancel_reason,
+            now=now,
+            keep_dedupe_keys=[row["dedupe_key"] for row in rows],
+        )
+        stmt = stmt.add_cte(cancel.returning(MessageJob.id).cte("canceled_jobs"))
 
     await session.execute(stmt)
 
@@ -203,6 +445,15 @@ async def count_client_visits(
     return result.scalar_one()
 
 
+class _RecordView(NamedTuple):
+    """The Record columns job planning reads."""
+
+    id: int
+    company_id: int
+    client_id: int | None
+    starts_at: datetime | None
+
+
 async def _load_record_and_client(
     session: AsyncSession,
     *,
@@ -210,10 +461,15 @@ async def _load_record_and_client(
     record_id: int | None,
     client: Client | None,
     client_id: int | None,
-) -> tuple[Record | None, Client | None]:
-    rec = record
+) -> tuple[Record | _RecordView | None, Client | None]:
+    rec: Record | _RecordView | None = record
     if rec is None and record_id is not None:
-        rec = await session.get(Record, record_id)
+        # Only four columns are needed: skip the rest of the row and the
+        # ORM identity map for this throwaway read.
+        stmt = select(Record.id, Record.company_id, Record.client_id, Record.starts_at).where(Record.id == record_id)
+        row = (await session.execute(stmt)).first()
+        if row is not None:
+            rec = _RecordView(*row)
 
     cli = client
     if cli is None:
@@ -238,7 +494,13 @@ async def plan_jobs_for_record_event(
     status: str | None = None,
     event_kind: str | None = None,
     source_cancelled_at: datetime | None = None,
+    now: datetime | None = None,
 ) -> None:
+    """Plan the jobs triggered by a record event.
+
+    ``now`` lets a caller that handles many events in one pass read the
+    clock once; it defaults to the current UTC time.
+    """
     norm_status = _normalize_event_status(event_status)
     if norm_status is None:
         norm_status = _normalize_event_status(status)
@@ -261,65 +523,64 @@ async def plan_jobs_for_record_event(
 
     cid = int(company_id) if company_id is not None else int(record_obj.company_id)
 
-    now = utcnow().replace(microsecond=0)
+    now = (now or utcnow()).replace(microsecond=0)
+    rid = int(record_obj.id)
+    # Read once: on an ORM Record each access goes through the
+    # instrumented attribute descriptor.
+    rec_client_id = record_obj.client_id
+    starts_at = record_obj.starts_at
 
-    if norm_status in ("update", "delete"):
-        reason = "Canceled: rescheduled"
-        if norm_status == "delete":
-            reason = "Canceled: record deleted"
+    cancel_reason: str | None = None
+    if norm_status == "update":
+        cancel_reason = "Canceled: rescheduled"
+    elif norm_status == "delete":
+        cancel_reason = "Canceled: record deleted"
 
-        await cancel_queued_jobs(
-            session,
+    job_type = _record_event_job_type(norm_status)
+    rows = [
+        build_job_row(
             company_id=cid,
-            record_id=int(record_obj.id),
-            reason=reason,
+            record_id=rid,
+            client_id=rec_client_id,
+            job_type=job_type,
+            run_at=now,
+            payload={"kind": job_type},
         )
-
-    job_type = _record_event_job_type(norm_status)
-    await add_job(
-        session,
-        company_id=cid,
-        record_id=int(record_obj.id),
-        client_id=record_obj.client_id,
-        job_type=job_type,
-        run_at=now,
-        payload={"kind": job_type},
-    )
-
-    starts_at = record_obj.starts_at
+    ]
 
     if norm_status in ("create", "update") and starts_at is not None:
-        run_at_24h = starts_at - timedelta(hours=24)
-        if run_at_24h > now:
-            await add_job(
-                session,
-                company_id=cid,
-                record_id=int(record_obj.id),
-                client_id=record_obj.client_id,
-                job_type=REMINDER_24H,
-                run_at=run_at_24h,
-                payload={"kind": REMINDER_24H},
+        # starts_at - lead > now  <=>  starts_at - now > lead, so a single
+        # subtraction decides both reminders.
+        delta = starts_at - now
+        if delta > REMINDER_24H_LEAD:
+            rows.append(
+                build_job_row(
+                    company_id=cid,
+                    record_id=rid,
+                    client_id=rec_client_id,
+                    job_type=REMINDER_24H,
+                    run_at=starts_at - REMINDER_24H_LEAD,
+                    payload={"kind": REMINDER_24H},
+                )
             )
 
-        delta = starts_at - now
-        if delta > timedelta(hours=2):
-            run_at_2h = starts_at - timedelta(hours=2)
-            if run_at_2h > now:
-                await add_job(
-                    session,
+        if delta > REMINDER_2H_LEAD:
+            rows.append(
+                build_job_row(
                     company_id=cid,
-                    record_id=int(record_obj.id),
-                    client_id=record_obj.client_id,
+                    record_id=rid,
+                    client_id=rec_client_id,
                     job_type=REMINDER_2H,
-                    run_at=run_at_2h,
+                    run_at=starts_at - REMINDER_2H_LEAD,
                     payload={"kind": REMINDER_2H},
                 )
+            )
 
     opted_out = bool(getattr(client_obj, "wa_opted_out", False))
 
     if norm_status in ("create", "update") and not opted_out:
         if starts_at is not None:
-            review_at = starts_at + timedelta(days=3)
+            review_at = starts_at + REVIEW_3D_DELAY
             if review_at > now:
                 # review_3d eligibility uses the Altegio API as the
                 # source of truth for attended visit counts.  The local
@@ -339,58 +600,46 @@ async def plan_jobs_for_record_event(
                     except Exception as exc:
                         logger.warning(
                             "Altegio API error for review_3d client_id=%s altegio_client_id=%s: %s",
-                            record_obj.client_id,
+                            rec_client_id,
                             altegio_cid,
                             exc,
                         )
 
                 if is_new_visitor:
-                    await add_job(
-                        session,
-                        company_id=cid,
-                        record_id=int(record_obj.id),
-                        client_id=record_obj.client_id,
-                        job_type=REVIEW_3D,
-                        run_at=review_at,
-                        payload={"kind": REVIEW_3D},
+                    rows.append(
+                        build_job_row(
+                            company_id=cid,
+                            record_id=rid,
+                            client_id=rec_client_id,
+                            job_type=REVIEW_3D,
+                            run_at=review_at,
+                            payload={"kind": REVIEW_3D},
+                        )
                     )
 
-            repeat_at = starts_at + timedelta(days=10)
+            repeat_at = starts_at + REPEAT_10D_DELAY
             if repeat_at > now:
-                await add_job(
-                    session,
-                    company_id=cid,
-                    record_id=int(record_obj.id),
-                    client_id=record_obj.client_id,
-                    job_type=REPEAT_10D,
-                    run_at=repeat_at,
-                    payload={"kind": REPEAT_10D},
+                rows.append(
+                    build_job_row(
+                        company_id=cid,
+                        record_id=rid,
+                        client_id=rec_client_id,
+                        job_type=REPEAT_10D,
+                        run_at=repeat_at,
+                        payload={"kind": REPEAT_10D},
+                    )
                 )
 
     if norm_status == "delete" and not opted_out:
-        already_queued = False
-
-        if record_obj.client_id is not None:
-            stmt = (
-                select(MessageJob.id)
-                .where(MessageJob.company_id == cid)
-                .where(MessageJob.client_id == record_obj.client_id)
-                .where(MessageJob.job_type == COMEBACK_3D)
-                .where(MessageJob.status == "queued")
-                .limit(1)
-            )
-            res = await session.execute(stmt)
-            if res.scalar_one_or_none() is not None:
-                already_queued = True
-
-        if not already_queued:
-            cancelled_at = _as_utc(source_cancelled_at) if source_cancelled_at is not None else now
-            comeback_at = cancelled_at + COMEBACK_3D_DELAY
-            await add_job(
-                session,
+        # A comeback already queued for the client's other records is
+        # checked in SQL by _write_record_jobs (comeback_client_id).
+        cancelled_at = _as_utc(source_cancelled_at) if source_cancelled_at is not None else now
+        comeback_at = cancelled_at + COMEBACK_3D_DELAY
+        rows.append(
+            build_job_row(
                 company_id=cid,
-                record_id=int(record_obj.id),
-                client_id=record_obj.client_id,
+                record_id=rid,
+                client_id=rec_client_id,
                 job_type=COMEBACK_3D,
                 run_at=comeback_at,
                 payload={
@@ -398,3 +647,14 @@ async def plan_jobs_for_record_event(
                     COMEBACK_3D_SOURCE_CANCELLED_AT_KEY: cancelled_at.isoformat(),
                 },
             )
+        )
+
+    await _write_record_jobs(
+        session,
+        company_id=cid,
+        record_id=rid,
+        rows=rows,
+        cancel_reason=cancel_reason,
+        now=now,
+        comeback_client_id=rec_client_id if norm_status == "delete" else None,
+    )
@@ -0,0 +1,92 @@
+"""Применение миграций Alembic при старте приложения.
+
+Режим задаётся настройкой migration_mode:
+
+- skip  — миграции не трогаем (их применяет отдельный шаг деплоя);
+- sync  — применяем до того, как приложение начнёт принимать запросы;
+  ошибка миграции прерывает старт;
+- async — применяем в фоне, статус виден в /health.
+
+Реплики сериализуются через advisory lock. В режиме sync реплика ждёт
+лок и после этого сама прогоняет upgrade (у опоздавших он ничего не
+делает), так что запросы никто не принимает до конца миграций. В режиме
+async реплика, не взявшая лок, миграции пропускает.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from pathlib import Path
+from typing import Literal
+
+from alembic.config import Config
+from sqlalchemy import text
+
+from alembic import command
+
+from .db import engine
+
+logger = logging.getLogger("altegio_migrations")
+
+MigrationStatus = Literal["skipped", "running", "succeeded", "failed"]
+
+# Произвольная константа, общая для всех реплик.
+MIGRATION_LOCK_ID = 0x616C74656769
+
+# alembic.ini лежит в корне проекта (в Docker — /app).
+ALEMBIC_INI = Path(__file__).resolve().parents[2] / "alembic.ini"
+
+_status: MigrationStatus = "skipped"
+
+
+def migration_status() -> MigrationStatus:
+    return _status
+
+
+def _upgrade_head() -> None:
+    # env.py сам вызывает asyncio.run(), поэтому запускаем в отдельном потоке.
+    command.upgrade(Config(str(ALEMBIC_INI)), "head")
+
+
+async def run_migrations(*, blocking: bool = False) -> None:
+    """Применить миграции под advisory lock.
+
+    blocking=True (режим sync): ждать лок, а не пропускать, и пробросить
+    ошибку upgrade, чтобы приложение не стартовало на полусхеме.
+    """
+    global _status
+
+    async with engine.connect() as conn:
+        if blocking:
+            await conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+        else:
+            locked = await conn.scalar(text("SELECT pg_try_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+            if not locked:
+                logger.info("Migrations are applied by another replica, skipping")
+                return
+
+        _status = "running"
+        try:
+            await asyncio.to_thread(_upgrade_head)
+        except Exception:
+            _status = "failed"
+            logger.exception("Alembic upgrade failed")
+            if blocking:
+                raise
+        else:
+            _status = "succeeded"
+        finally:
+            await conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID})
+
+
+async def start_migrations(mode: str) -> asyncio.Task[None] | None:
+    """Запустить миграции согласно mode; для async вернуть фоновую задачу."""
+    if mode == "sync":
+        await run_migrations(blocking=True)
+        return None
+
+    if mode == "async":
+        return asyncio.create_task(run_migrations(), name="alembic-upgrade")
+
+    return None
@@ -142,7 +142,7 @@ class Client(Base):
         autoincrement=True,
     )
 
-    company_id: Mapped[int] = mapped_column(Integer, index=True)
+    company_id: Mapped[int] = mapped_column(Integer)
     altegio_client_id: Mapped[int] = mapped_column(BigInteger, index=True)
 
     phone_e164: Mapped[str | None] = mapped_column(
@@ -195,7 +195,7 @@ class Record(Base):
         autoincrement=True,
     )
 
-    company_id: Mapped[int] = mapped_column(Integer, index=True)
+    company_id: Mapped[int] = mapped_column(Integer)
     altegio_record_id: Mapped[int] = mapped_column(BigInteger, index=True)
 
     client_id: Mapped[int | None] = mapped_column(
@@ -330,6 +330,19 @@ class MessageJob(Base):
             "status",
         ),
         Index("ix_message_jobs_status_locked_at", "status", "locked_at"),
+        # отмена queued-задач записи при update/delete
+        Index(
+            "ix_msgjob_record_queued",
+            "record_id",
+            "job_type",
+            postgresql_where=text("status = 'queued'"),
+        ),
+        # выборка due-задач воркером: только очередь, без истории
+        Index(
+            "ix_message_jobs_queued_run_at",
+            "run_at",
+            postgresql_where=text("status = 'queued'"),
+        ),
     )
 
     id: Mapped[int] = mapped_column(
@@ -518,7 +531,7 @@ class WhatsAppSender(Base):
         primary_key=True,
         autoincrement=True,
     )
-    company_id: Mapped[int] = mapped_column(Integer, index=True)
+    company_id: Mapped[int] = mapped_column(Integer)
     sender_code: Mapped[str] = mapped_column(String(32), index=True)
 
     phone_number_id: Mapped[str] = mapped_column(String(64))
@@ -544,7 +557,7 @@ class ServiceSenderRule(Base):
         autoincrement=True,
     )
 
-    company_id: Mapped[int] = mapped_column(Integer, index=True)
+    company_id: Mapped[int] = mapped_column(Integer)
     service_id: Mapped[int] = mapped_column(Integer, index=True)
 
     sender_code: Mapped[str] = mapped_column(String(32))
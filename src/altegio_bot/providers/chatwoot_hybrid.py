@@ -54,6 +54,12 @@ class ChatwootHybridProvider:
             await aclose_primary()
         await self._chatwoot.aclose()
 
+    async def warm_sender_cache(self) -> int:
+        warm_primary = getattr(self._primary, "warm_sender_cache", None)
+        if callable(warm_primary):
+            return await warm_primary()
+        return 0
+
     def _schedule_mirror(self, coro: Any) -> None:
         """Schedule a mirror coroutine as a tracked background task."""
         task: asyncio.Task[None] = asyncio.create_task(coro)
@@ -2,7 +2,6 @@ from __future__ import annotations
 
 import logging
 import os
-from uuid import uuid4
 
 from altegio_bot.providers.base import WhatsAppProvider
 
@@ -42,7 +41,7 @@ class DummyProvider(WhatsAppProvider):
         *,
         contact_name: str | None = None,
     ) -> str:
-        provider_message_id = f"dummy-{uuid4()}"
+        provider_message_id = f"dummy-{os.urandom(12).hex()}"
         logger.info(
             "Dummy send sender_id=%s phone=%s text_len=%s msg_id=%s",
             sender_id,
@@ -64,7 +63,7 @@ class DummyProvider(WhatsAppProvider):
         contact_name: str | None = None,
         header_image_url: str | None = None,
     ) -> str:
-        provider_message_id = f"dummy-tpl-{uuid4()}"
+        provider_message_id = f"dummy-tpl-{os.urandom(12).hex()}"
         logger.info(
             "Dummy send_template sender_id=%s phone=%s template=%s lang=%s params=%s header=%s msg_id=%s",
             sender_id,
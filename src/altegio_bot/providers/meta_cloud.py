@@ -5,6 +5,8 @@ import os
 from typing import Any
 
 import httpx
+import orjson
+from sqlalchemy import select
 
 from altegio_bot.db import SessionLocal
 from altegio_bot.models.models import WhatsAppSender
@@ -13,8 +15,19 @@ from altegio_bot.providers.base import WhatsAppProvider
 logger = logging.getLogger(__name__)
 
 
+# Один клиент на провайдер; keep-alive держим дольше дефолтных 5 с,
+# чтобы между отправками воркера не переоткрывать TLS к graph.facebook.com.
+_GRAPH_LIMITS = httpx.Limits(
+    max_connections=100,
+    max_keepalive_connections=20,
+    keepalive_expiry=75.0,
+)
+
+
 def _strip_plus(phone_e164: str) -> str:
-    return phone_e164.lstrip("+").strip()
+    # strip() не копирует строку без пробелов по краям, removeprefix —
+    # один срез только при наличии "+".
+    return phone_e164.strip().removeprefix("+")
 
 
 class MetaCloudProvider(WhatsAppProvider):
@@ -40,7 +53,7 @@ class MetaCloudProvider(WhatsAppProvider):
 
         self._allow_real_send = os.getenv("ALLOW_REAL_SEND", "0").strip() == "1"
         self._sender_cache: dict[int, str] = {}
-        self._client = httpx.AsyncClient(timeout=timeout_sec)
+        self._client = httpx.AsyncClient(timeout=timeout_sec, limits=_GRAPH_LIMITS)
 
         if not self._access_token:
             raise RuntimeError("WHATSAPP_ACCESS_TOKEN is not set")
@@ -48,6 +61,23 @@ class MetaCloudProvider(WhatsAppProvider):
     async def aclose(self) -> None:
         await self._client.aclose()
 
+    async def warm_sender_cache(self) -> int:
+        """Load phone_number_id of every active sender in one query.
+
+        Called at worker startup so the first sends do not each open a
+        session for their sender; senders added later are still fetched
+        on demand by _get_phone_number_id().
+        """
+        stmt = select(WhatsAppSender.id, WhatsAppSender.phone_number_id).where(WhatsAppSender.is_active.is_(True))
+        async with SessionLocal() as session:
+            rows = (await session.execute(stmt)).all()
+
+        for sender_id, phone_number_id in rows:
+            phone_number_id = (phone_number_id or "").strip()
+            if phone_number_id:
+                self._sender_cache[int(sender_id)] = phone_number_id
+        return len(self._sender_cache)
+
     async def _get_phone_number_id(self, sender_id: int) -> str:
         cached = self._sender_cache.get(sender_id)
         if cached:
@@ -67,7 +97,20 @@ class MetaCloudProvider(WhatsAppProvider):
         return phone_number_id
 
     def _headers(self) -> dict[str, str]:
-        return {"Authorization": f"Bearer {self._access_token}"}
+        return {
+            "Authorization": f"Bearer {self._access_token}",
+            "Content-Type": "application/json",
+        }
+
+    async def _post(self, url: str, payload: dict[str, Any]) -> tuple[int, Any]:
+        # orjson и для тела, и для ответа: быстрее stdlib json, который
+        # httpx использует для json= и Response.json().
+        res = await self._client.post(url, headers=self._headers(), content=orjson.dumps(payload))
+        try:
+            data = orjson.loads(res.content)
+        except orjson.JSONDecodeError:
+            data = {}
+        return res.status_code, data
 
     async def send(
         self,
@@ -94,20 +137,14 @@ class MetaCloudProvider(WhatsAppProvider):
             },
         }
 
-        res = await self._client.post(url, headers=self._headers(), json=payload)
-
-        data: dict[str, Any] = {}
-        try:
-            data = res.json()
-        except Exception:
-            data = {}
+        status_code, data = await self._post(url, payload)
 
-        if res.status_code >= 400:
+        if status_code >= 400:
             err = data.get("error") if isinstance(data, dict) else None
             msg = None
             if isinstance(err, dict):
                 msg = err.get("message")
-            raise RuntimeError(f"Meta send failed status={res.status_code} body={msg or data}")
+            raise RuntimeError(f"Meta send failed status={status_code} body={msg or data}")
 
         messages = data.get("messages") if isinstance(data, dict) else None
         if isinstance(messages, list) and messages:
@@ -170,21 +207,15 @@ class MetaCloudProvider(WhatsAppProvider):
             },
         }
 
-        res = await self._client.post(url, headers=self._headers(), json=payload)
-
-        data: dict[str, Any] = {}
-        try:
-            data = res.json()
-        except Exception:
-            data = {}
+        status_code, data = await self._post(url, payload)
 
-        if res.status_code >= 400:
+        if status_code >= 400:
             err = data.get("error") if isinstance(data, dict) else None
             msg = None
             if isinstance(err, dict):
                 msg = err.get("message")
             raise RuntimeError(
-                f"Meta send_template failed status={res.status_code} template={template_name} body={msg or data}"
+                f"Meta send_template failed status={status_code} template={template_name} body={msg or data}"
             )
 
         messages = data.get("messages") if isinstance(data, dict) else None
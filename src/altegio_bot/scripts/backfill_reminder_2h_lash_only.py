@@ -4,11 +4,12 @@ import argparse
 import asyncio
 import logging
 from datetime import timedelta
+from typing import Any
 
 from sqlalchemy import select
 
 from altegio_bot.db import SessionLocal
-from altegio_bot.message_planner import REMINDER_2H, add_job
+from altegio_bot.message_planner import REMINDER_2H, add_jobs, build_job_row
 from altegio_bot.models.models import MessageJob, Record
 from altegio_bot.service_filter import (
     LASH_CATEGORY_IDS_BY_COMPANY,
@@ -27,7 +28,7 @@ EXACT_ALLOWED_CATEGORY_IDS = {
 
 def apply_exact_category_filter() -> None:
     for company_id in list(LASH_CATEGORY_IDS_BY_COMPANY.keys()):
-        LASH_CATEGORY_IDS_BY_COMPANY[company_id] = set(EXACT_ALLOWED_CATEGORY_IDS)
+        LASH_CATEGORY_IDS_BY_COMPANY[company_id] = frozenset(EXACT_ALLOWED_CATEGORY_IDS)
 
 
 async def reminder_2h_exists(record_id: int, run_at) -> bool:
@@ -91,6 +92,7 @@ async def run_backfill(
     skipped_existing = 0
     skipped_not_lash = 0
     inserted = 0
+    rows: list[dict[str, Any]] = []
 
     async with SessionLocal() as session:
         async with session.begin():
@@ -145,17 +147,21 @@ async def run_backfill(
                 if dry_run:
                     continue
 
-                await add_job(
-                    session,
-                    company_id=int(record.company_id),
-                    record_id=int(record.id),
-                    client_id=record.client_id,
-                    job_type=REMINDER_2H,
-                    run_at=run_at,
-                    payload={"kind": REMINDER_2H},
+                rows.append(
+                    build_job_row(
+                        company_id=int(record.company_id),
+                        record_id=int(record.id),
+                        client_id=record.client_id,
+                        job_type=REMINDER_2H,
+                        run_at=run_at,
+                        payload={"kind": REMINDER_2H},
+                    )
                 )
                 inserted += 1
 
+            if rows:
+                await add_jobs(session, rows)
+
     logger.info(
         "Backfill finished: checked=%s inserted=%s skipped_existing=%s skipped_not_lash=%s dry_run=%s",
         checked,
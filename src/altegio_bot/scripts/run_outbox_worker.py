@@ -16,6 +16,11 @@ async def main() -> None:
     provider = get_provider()
 
     try:
+        # Прогрев внутри try: если БД недоступна, клиент провайдера всё равно закроется.
+        warm = getattr(provider, "warm_sender_cache", None)
+        if callable(warm):
+            await warm()
+
         await run_loop(provider=provider)
     finally:
         aclose = getattr(provider, "aclose", None)
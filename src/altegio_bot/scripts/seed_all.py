@@ -0,0 +1,21 @@
+"""Все сиды одним запуском: один event loop и общий пул соединений.
+
+Сиды выполняются по очереди: если первый упал, второй не запускается,
+и скрипт завершается с ненулевым кодом выхода. Отдельные скрипты
+по-прежнему можно запускать по одному.
+"""
+
+from __future__ import annotations
+
+import asyncio
+
+from altegio_bot.scripts import seed_senders, seed_templates
+
+
+async def main() -> None:
+    await seed_senders.main()
+    await seed_templates.main()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -2,7 +2,9 @@ from __future__ import annotations
 
 import asyncio
 
-from sqlalchemy import select
+from sqlalchemy import or_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from altegio_bot.db import SessionLocal
 from altegio_bot.models.models import ServiceSenderRule, WhatsAppSender
@@ -31,50 +33,50 @@ RULES = [
 ]
 
 
-async def upsert_sender(data: dict) -> None:
-    async with SessionLocal() as session:
-        async with session.begin():
-            stmt = (
-                select(WhatsAppSender)
-                .where(WhatsAppSender.company_id == data["company_id"])
-                .where(WhatsAppSender.sender_code == data["sender_code"])
-            )
-            res = await session.execute(stmt)
-            obj = res.scalar_one_or_none()
-
-            if obj is None:
-                session.add(WhatsAppSender(**data))
-                return
+async def upsert_senders(session: AsyncSession, rows: list[dict]) -> int:
+    """Вернуть число вставленных или изменённых строк."""
+    if not rows:
+        return 0
+
+    stmt = pg_insert(WhatsAppSender).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[WhatsAppSender.company_id, WhatsAppSender.sender_code],
+        set_={
+            "phone_number_id": stmt.excluded.phone_number_id,
+            "display_phone": stmt.excluded.display_phone,
+            "is_active": True,
+        },
+        # Совпадающие строки не переписываем: повторный сид не плодит лишних UPDATE.
+        where=or_(
+            WhatsAppSender.phone_number_id.is_distinct_from(stmt.excluded.phone_number_id),
+            WhatsAppSender.display_phone.is_distinct_from(stmt.excluded.display_phone),
+            WhatsAppSender.is_active.is_not(True),
+        ),
+    )
+    res = await session.execute(stmt)
+    return res.rowcount
+
+
+async def upsert_rules(session: AsyncSession, rows: list[dict]) -> int:
+    """Вернуть число вставленных или изменённых строк."""
+    if not rows:
+        return 0
+
+    stmt = pg_insert(ServiceSenderRule).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ServiceSenderRule.company_id, ServiceSenderRule.service_id],
+        set_={"sender_code": stmt.excluded.sender_code},
+        where=ServiceSenderRule.sender_code.is_distinct_from(stmt.excluded.sender_code),
+    )
+    res = await session.execute(stmt)
+    return res.rowcount
 
-            obj.phone_number_id = data["phone_number_id"]
-            obj.display_phone = data.get("display_phone")
-            obj.is_active = True
 
-
-async def upsert_rule(data: dict) -> None:
+async def main() -> None:
     async with SessionLocal() as session:
         async with session.begin():
-            stmt = (
-                select(ServiceSenderRule)
-                .where(ServiceSenderRule.company_id == data["company_id"])
-                .where(ServiceSenderRule.service_id == data["service_id"])
-            )
-            res = await session.execute(stmt)
-            obj = res.scalar_one_or_none()
-
-            if obj is None:
-                session.add(ServiceSenderRule(**data))
-                return
-
-            obj.sender_code = data["sender_code"]
-
-
-async def main() -> None:
-    for s in SENDERS:
-        await upsert_sender(s)
-
-    for r in RULES:
-        await upsert_rule(r)
+            await upsert_senders(session, SENDERS)
+            await upsert_rules(session, RULES)
 
 
 if __name__ == "__main__":
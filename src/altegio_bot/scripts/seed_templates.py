@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from collections.abc import Callable
 from dataclasses import dataclass
 
 from sqlalchemy import delete
@@ -42,19 +43,25 @@ COMPANIES: dict[int, _CompanyCfg] = {
 
 
 def _footer(cfg: _CompanyCfg) -> str:
-    return (
-        f"\n\n{cfg.brand_line}\n"
-        f"{cfg.address_line}\n"
-        f"{cfg.phone_line}\n\n"
-        f"{cfg.maps_line}\n"
-        f"{cfg.instagram_line}\n"
-        "_______________________\n"
-        "Wenn die Links inaktiv sind, fügen Sie uns zur Kontaktliste hinzu.\n\n"
-        "Newsletter abbestellen: {unsubscribe_link}"
+    return "\n".join(
+        (
+            "",
+            "",
+            cfg.brand_line,
+            cfg.address_line,
+            cfg.phone_line,
+            "",
+            cfg.maps_line,
+            cfg.instagram_line,
+            "_______________________",
+            "Wenn die Links inaktiv sind, fügen Sie uns zur Kontaktliste hinzu.",
+            "",
+            "Newsletter abbestellen: {unsubscribe_link}",
+        )
     )
 
 
-def _body_record_created(cfg: _CompanyCfg) -> str:
+def _body_record_created(footer: str) -> str:
     return (
         "*{client_name}, hallo! Ihre Terminbuchung wurde bestätigt:*\n\n"
         "*Ausgewählte Mitarbeiterin:* {staff_name}\n"
@@ -63,12 +70,11 @@ def _body_record_created(cfg: _CompanyCfg) -> str:
         "*Service:*\n"
         "{services}\n"
         "*Summe:* {total_cost}€\n"
-        "{pre_appointment_notes}"
-        f"{_footer(cfg)}"
+        "{pre_appointment_notes}" + footer
     )
 
 
-def _body_record_updated(cfg: _CompanyCfg) -> str:
+def _body_record_updated(footer: str) -> str:
     return (
         "*{client_name}, hallo! Ihr Termin wurde geändert:*\n\n"
         "*Ausgewählte Mitarbeiterin:* {staff_name}\n"
@@ -76,22 +82,20 @@ def _body_record_updated(cfg: _CompanyCfg) -> str:
         "*Neue Zeit:* {time}\n"
         "*Service:*\n"
         "{services}\n"
-        "*Summe:* {total_cost}€"
-        f"{_footer(cfg)}"
+        "*Summe:* {total_cost}€" + footer
     )
 
 
-def _body_record_canceled(cfg: _CompanyCfg) -> str:
+def _body_record_canceled(footer: str) -> str:
     return (
         "*{client_name}, hallo!*\n\n"
         "Ihr Termin wurde storniert.\n\n"
         "Wenn Sie einen neuen Termin vereinbaren möchten, buchen Sie hier:\n"
-        "{booking_link}"
-        f"{_footer(cfg)}"
+        "{booking_link}" + footer
     )
 
 
-def _body_reminder_24h(cfg: _CompanyCfg) -> str:
+def _body_reminder_24h(footer: str) -> str:
     return (
         "*{client_name}, hallo!* Erinnerung an Ihren Termin morgen.\n\n"
         "*Mitarbeiterin:* {staff_name}\n"
@@ -99,12 +103,11 @@ def _body_reminder_24h(cfg: _CompanyCfg) -> str:
         "*Zeit:* {time}\n"
         "*Service:*\n"
         "{services}\n"
-        "*Summe:* {total_cost}€"
-        f"{_footer(cfg)}"
+        "*Summe:* {total_cost}€" + footer
     )
 
 
-def _body_reminder_2h(cfg: _CompanyCfg) -> str:
+def _body_reminder_2h(footer: str) -> str:
     return (
         "*{client_name}, hallo!*\n\n"
         "Erinnerung: Ihr Termin beginnt in ca. 2 Stunden.\n\n"
@@ -113,33 +116,30 @@ def _body_reminder_2h(cfg: _CompanyCfg) -> str:
         "*Zeit:* {time}\n"
         "*Service:*\n"
         "{services}\n"
-        "*Summe:* {total_cost}€"
-        f"{_footer(cfg)}"
+        "*Summe:* {total_cost}€" + footer
     )
 
 
-def _body_review_3d(cfg: _CompanyCfg) -> str:
+def _body_review_3d(footer: str) -> str:
     return (
         "*{client_name}, hallo!*\n\n"
         "Vielen Dank für Ihren Besuch bei KitiLash!\n"
         "Wenn Sie zufrieden waren, würden wir uns sehr über eine kurze "
         "Bewertung freuen.\n\n"
-        "Link: {short_link}"
-        f"{_footer(cfg)}"
+        "Link: {short_link}" + footer
     )
 
 
-def _body_comeback_3d(cfg: _CompanyCfg) -> str:
+def _body_comeback_3d(footer: str) -> str:
     return (
         "*{client_name}, hallo!*\n\n"
         "Schade, dass es diesmal nicht geklappt hat.\n"
         "Wenn Sie einen neuen Termin möchten, buchen Sie hier:\n"
-        "{booking_link}"
-        f"{_footer(cfg)}"
+        "{booking_link}" + footer
     )
 
 
-def _body_repeat_10d(cfg: _CompanyCfg) -> str:
+def _body_repeat_10d(footer: str) -> str:
     return (
         "*Hallo, {client_name}* 🙂\n\n"
         "Ich hoffe, dir geht es gut.\n\n"
@@ -153,35 +153,46 @@ def _body_repeat_10d(cfg: _CompanyCfg) -> str:
         "rechtzeitig.\n\n"
         "*Wir warten auf dich im KitiLash: {booking_link}*\n\n"
         "Ich freue mich auf deine Antwort!\n\n"
-        "Liebe Grüße, Julia"
-        f"{_footer(cfg)}"
+        "Liebe Grüße, Julia" + footer
     )
 
 
+_BODY_BUILDERS: dict[str, Callable[[str], str]] = {
+    "record_created": _body_record_created,
+    "record_updated": _body_record_updated,
+    "record_canceled": _body_record_canceled,
+    "reminder_24h": _body_reminder_24h,
+    "reminder_2h": _body_reminder_2h,
+    "review_3d": _body_review_3d,
+    "comeback_3d": _body_comeback_3d,
+    "repeat_10d": _body_repeat_10d,
+}
+
+
+def _build_bodies() -> dict[tuple[int, str], str]:
+    out: dict[tuple[int, str], str] = {}
+    for cfg in COMPANIES.values():
+        footer = _footer(cfg)
+        for code, build in _BODY_BUILDERS.items():
+            out[(cfg.company_id, code)] = build(footer)
+    return out
+
+
+# Тексты зависят только от статичного COMPANIES — собираем один раз при импорте.
+_BODIES: dict[tuple[int, str], str] = _build_bodies()
+
+
 def _templates_for_company(cfg: _CompanyCfg) -> list[MessageTemplate]:
-    bodies = {
-        "record_created": _body_record_created(cfg),
-        "record_updated": _body_record_updated(cfg),
-        "record_canceled": _body_record_canceled(cfg),
-        "reminder_24h": _body_reminder_24h(cfg),
-        "reminder_2h": _body_reminder_2h(cfg),
-        "review_3d": _body_review_3d(cfg),
-        "comeback_3d": _body_comeback_3d(cfg),
-        "repeat_10d": _body_repeat_10d(cfg),
-    }
-
-    out: list[MessageTemplate] = []
-    for code, body in bodies.items():
-        out.append(
-            MessageTemplate(
-                company_id=cfg.company_id,
-                code=code,
-                language="de",
-                body=body,
-                is_active=True,
-            )
+    return [
+        MessageTemplate(
+            company_id=cfg.company_id,
+            code=code,
+            language="de",
+            body=_BODIES[(cfg.company_id, code)],
+            is_active=True,
         )
-    return out
+        for code in _BODY_BUILDERS
+    ]
 
 
 async def main() -> None:
@@ -189,9 +200,7 @@ async def main() -> None:
         async with session.begin():
             await session.execute(delete(MessageTemplate).where(MessageTemplate.company_id.in_(list(COMPANIES.keys()))))
 
-            for cfg in COMPANIES.values():
-                for tmpl in _templates_for_company(cfg):
-                    session.add(tmpl)
+            session.add_all(tmpl for cfg in COMPANIES.values() for tmpl in _templates_for_company(cfg))
 
     print("seeded message_templates for:", ", ".join(map(str, COMPANIES)))
 
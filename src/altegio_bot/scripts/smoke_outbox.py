@@ -4,13 +4,16 @@ import argparse
 import asyncio
 import logging
 import os
+import random
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from decimal import Decimal
 from typing import Any
 
-from sqlalchemy import func, select, text
+from sqlalchemy import Integer, bindparam, func, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
@@ -25,6 +28,7 @@ from altegio_bot.models.models import (
     ServiceSenderRule,
     WhatsAppSender,
 )
+from altegio_bot.settings import settings
 from altegio_bot.workers import outbox_worker as ow
 
 logger = logging.getLogger("smoke_outbox")
@@ -96,29 +100,48 @@ def _database_url() -> str:
     return url
 
 
+_engine: AsyncEngine | None = None
+
+
 def _make_sessionmaker() -> async_sessionmaker[AsyncSession]:
-    engine = create_async_engine(_database_url(), echo=False)
-    return async_sessionmaker(engine, expire_on_commit=False)
+    # Один движок на процесс: повторные вызовы переиспользуют пул.
+    global _engine
+    if _engine is None:
+        _engine = create_async_engine(
+            _database_url(),
+            echo=False,
+            # Те же параметры пула, что у основного движка (altegio_bot.db).
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_recycle=1800,
+            pool_pre_ping=settings.db_pool_pre_ping,
+            connect_args={"server_settings": {"application_name": "smoke_outbox"}},
+        )
+    return async_sessionmaker(_engine, expire_on_commit=False)
+
+
+_SEQUENCE_TABLES = (
+    "whatsapp_senders",
+    "message_templates",
+    "clients",
+    "records",
+    "message_jobs",
+    "outbox_messages",
+)
+
+# Все setval одним запросом: по колонке на таблицу.
+_FIX_SEQUENCES_SQL = "SELECT " + ",\n".join(
+    f"""setval(
+      pg_get_serial_sequence('{table}', 'id'),
+      COALESCE((SELECT MAX(id) FROM {table}), 1),
+      (SELECT MAX(id) FROM {table}) IS NOT NULL
+    )"""
+    for table in _SEQUENCE_TABLES
+)
 
 
 async def _fix_sequences(session: AsyncSession) -> None:
-    tables = [
-        "whatsapp_senders",
-        "message_templates",
-        "clients",
-        "records",
-        "message_jobs",
-        "outbox_messages",
-    ]
-    for table in tables:
-        sql = f"""
-        SELECT setval(
-          pg_get_serial_sequence('{table}', 'id'),
-          COALESCE((SELECT MAX(id) FROM {table}), 1),
-          (SELECT MAX(id) FROM {table}) IS NOT NULL
-        );
-        """
-        await session.execute(text(sql))
+    await session.execute(text(_FIX_SEQUENCES_SQL))
 
 
 async def _seed_rate_limit(
@@ -181,47 +204,44 @@ async def _get_or_create_sender(
     session: AsyncSession,
     cfg: SmokeConfig,
 ) -> WhatsAppSender:
-    stmt = select(WhatsAppSender).where(
-        WhatsAppSender.company_id == cfg.company_id,
-        WhatsAppSender.sender_code == cfg.sender_code,
+    stmt = (
+        pg_insert(WhatsAppSender)
+        .values(
+            company_id=cfg.company_id,
+            sender_code=cfg.sender_code,
+            phone_number_id=f"dummy-{os.urandom(8).hex()}",
+            display_phone="+491111111111",
+            is_active=True,
+        )
+        .on_conflict_do_nothing(index_elements=[WhatsAppSender.company_id, WhatsAppSender.sender_code])
+        .returning(WhatsAppSender)
     )
-    res = await session.execute(stmt)
-    sender = res.scalar_one_or_none()
-    if sender:
+    sender = (await session.scalars(stmt)).one_or_none()
+    if sender is not None:
         return sender
 
-    sender = WhatsAppSender(
-        company_id=cfg.company_id,
-        sender_code=cfg.sender_code,
-        phone_number_id=f"dummy-{os.urandom(8).hex()}",
-        display_phone="+491111111111",
-        is_active=True,
+    # Отправитель уже был: ON CONFLICT DO NOTHING ничего не вернул.
+    stmt = select(WhatsAppSender).where(
+        WhatsAppSender.company_id == cfg.company_id,
+        WhatsAppSender.sender_code == cfg.sender_code,
     )
-    session.add(sender)
-    await session.flush()
-    return sender
+    return (await session.scalars(stmt)).one()
 
 
 async def _ensure_service_sender_rule(
     session: AsyncSession,
     cfg: SmokeConfig,
 ) -> None:
-    stmt = select(ServiceSenderRule).where(
-        ServiceSenderRule.company_id == cfg.company_id,
-        ServiceSenderRule.service_id == cfg.service_id,
-    )
-    res = await session.execute(stmt)
-    rule = res.scalar_one_or_none()
-    if rule:
-        return
-
-    rule = ServiceSenderRule(
-        company_id=cfg.company_id,
-        service_id=cfg.service_id,
-        sender_code=cfg.sender_code,
+    stmt = (
+        pg_insert(ServiceSenderRule)
+        .values(
+            company_id=cfg.company_id,
+            service_id=cfg.service_id,
+            sender_code=cfg.sender_code,
+        )
+        .on_conflict_do_nothing(index_elements=[ServiceSenderRule.company_id, ServiceSenderRule.service_id])
     )
-    session.add(rule)
-    await session.flush()
+    await session.execute(stmt)
 
 
 async def _ensure_template(
@@ -268,26 +288,27 @@ async def _create_fixtures(
     await _ensure_service_sender_rule(session, cfg)
     await _ensure_template(session, cfg)
 
+    if seed_rate_limit_minutes is not None:
+        await _seed_rate_limit(session, cfg.phone_e164, seed_rate_limit_minutes)
+
+    # client → record → service связаны relationship'ами и уходят одним flush.
+    # Smoke-id не секретны: хватает PRNG без системного вызова на каждый id.
+    altegio_client_id = random.getrandbits(48)
     client = Client(
         company_id=cfg.company_id,
-        altegio_client_id=int.from_bytes(os.urandom(6), "big"),
+        altegio_client_id=altegio_client_id,
         phone_e164=cfg.phone_e164,
         display_name=cfg.display_name,
         email=None,
         raw={},
     )
-    session.add(client)
-    await session.flush()
-
-    if seed_rate_limit_minutes is not None:
-        await _seed_rate_limit(session, cfg.phone_e164, seed_rate_limit_minutes)
 
     starts_at = utcnow() + timedelta(hours=2)
     record = Record(
         company_id=cfg.company_id,
-        altegio_record_id=int.from_bytes(os.urandom(6), "big"),
-        client_id=client.id,
-        altegio_client_id=client.altegio_client_id,
+        altegio_record_id=random.getrandbits(48),
+        client=client,
+        altegio_client_id=altegio_client_id,
         staff_id=None,
         staff_name=cfg.staff_name,
         starts_at=starts_at,
@@ -302,21 +323,19 @@ async def _create_fixtures(
         total_cost=Decimal("10.00"),
         last_change_at=None,
         raw={},
+        services=[
+            RecordService(
+                service_id=cfg.service_id,
+                title="Smoke service",
+                amount=1,
+                cost_to_pay=Decimal("10.00"),
+                raw={},
+            )
+        ],
     )
     session.add(record)
     await session.flush()
 
-    service = RecordService(
-        record_id=record.id,
-        service_id=cfg.service_id,
-        title="Smoke service",
-        amount=1,
-        cost_to_pay=Decimal("10.00"),
-        raw={},
-    )
-    session.add(service)
-    await session.flush()
-
     job = MessageJob(
         company_id=cfg.company_id,
         record_id=record.id,
@@ -331,7 +350,6 @@ async def _create_fixtures(
         payload={},
     )
     session.add(job)
-    await session.flush()
 
     await session.commit()
     return int(job.id)
@@ -488,6 +506,18 @@ async def _race_rate_limit(
         await _print_job_state(session, clone_id)
 
 
+# Выборки строятся один раз, лимит и компания приходят параметрами —
+# повторные прогоны берут запрос из кеша компиляции.
+_QUEUED_JOB_IDS_STMT = (
+    select(MessageJob.id)
+    .where(MessageJob.status == "queued")
+    .where(MessageJob.run_at <= func.now())
+    .order_by(MessageJob.run_at.asc(), MessageJob.id.asc())
+    .limit(bindparam("limit", type_=Integer))
+)
+_QUEUED_JOB_IDS_FOR_COMPANY_STMT = _QUEUED_JOB_IDS_STMT.where(MessageJob.company_id == bindparam("company_id"))
+
+
 async def _run_worker_once(
     session_maker: async_sessionmaker[AsyncSession],
     *,
@@ -502,17 +532,13 @@ async def _run_worker_once(
             await session.commit()
             return 1
 
-        stmt = (
-            select(MessageJob.id)
-            .where(MessageJob.status == "queued")
-            .where(MessageJob.run_at <= func.now())
-            .order_by(MessageJob.run_at.asc(), MessageJob.id.asc())
-            .limit(limit)
-        )
-        if company_id is not None:
-            stmt = stmt.where(MessageJob.company_id == company_id)
-
-        res = await session.execute(stmt)
+        if company_id is None:
+            res = await session.execute(_QUEUED_JOB_IDS_STMT, {"limit": limit})
+        else:
+            res = await session.execute(
+                _QUEUED_JOB_IDS_FOR_COMPANY_STMT,
+                {"limit": limit, "company_id": company_id},
+            )
         ids = list(res.scalars().all())
 
         for _id in ids:
@@ -560,7 +586,7 @@ def _parse_args() -> argparse.Namespace:
     return parser.parse_args()
 
 
-async def main() -> None:
+async def _run() -> None:
     logging.basicConfig(level=logging.INFO)
     args = _parse_args()
 
@@ -640,5 +666,14 @@ async def main() -> None:
         await _print_job_state(session, job_id)
 
 
+async def main() -> None:
+    try:
+        await _run()
+    finally:
+        # Скрипт одноразовый: закрываем пул, не дожидаясь сборщика мусора.
+        if _engine is not None:
+            await _engine.dispose()
+
+
 if __name__ == "__main__":
     asyncio.run(main())
@@ -14,6 +14,7 @@ from __future__ import annotations
 import logging
 import os
 from collections import OrderedDict
+from collections.abc import Sequence
 from dataclasses import dataclass, field
 from typing import Any
 
@@ -52,11 +53,15 @@ class LashRecordFilterResult:
     lookup_failed_record_ids: set[int] = field(default_factory=set)
 
 
-LASH_CATEGORY_IDS_BY_COMPANY: dict[int, set[int]] = {
-    1271200: {10707687, 12414859, 13329127, 13351976},
-    758285: {10707687, 12414859, 13329127, 13351956},
+# frozenset: значения разделяются всеми вызовами, менять их на месте нельзя.
+LASH_CATEGORY_IDS_BY_COMPANY: dict[int, frozenset[int]] = {
+    1271200: frozenset({10707687, 12414859, 13329127, 13351976}),
+    758285: frozenset({10707687, 12414859, 13329127, 13351956}),
 }
 
+# Общий пустой набор для промахов по словарям — без аллокации на каждый вызов.
+_EMPTY_IDS: frozenset[int] = frozenset()
+
 # ---------------------------------------------------------------------------
 # LRU-кеш: (company_id, service_id) → category_id
 # ---------------------------------------------------------------------------
@@ -343,7 +348,7 @@ async def filter_lash_record_ids(
     lash_record_ids: set[int] = set()
     failed_record_ids: set[int] = set()
     for rec_id in record_ids:
-        svc_ids = record_svcs.get(rec_id, set())
+        svc_ids = record_svcs.get(rec_id, _EMPTY_IDS)
         if any(s in lash_svc for s in svc_ids):
             lash_record_ids.add(rec_id)
         elif any(s in unknown_svc for s in svc_ids):
@@ -361,14 +366,21 @@ async def record_has_allowed_service(
     *,
     company_id: int,
     record_id: int,
+    service_ids: Sequence[int] | None = None,
 ) -> bool:
+    """Есть ли у записи ресничная услуга.
+
+    service_ids — услуги записи, если вызывающий их уже знает (например,
+    только что записал из вебхука); тогда record_services не читаем.
+    """
     allowed_categories = LASH_CATEGORY_IDS_BY_COMPANY.get(company_id)
     if not allowed_categories:
         return False
 
-    stmt = select(RecordService.service_id).where(RecordService.record_id == record_id)
-    res = await session.execute(stmt)
-    service_ids = res.scalars().all()
+    if service_ids is None:
+        stmt = select(RecordService.service_id).where(RecordService.record_id == record_id)
+        res = await session.execute(stmt)
+        service_ids = res.scalars().all()
 
     for sid in service_ids:
         key = (company_id, sid)
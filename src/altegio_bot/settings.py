@@ -16,6 +16,22 @@ class Settings(BaseSettings):
     database_url: str
     altegio_webhook_secret: str
 
+    # Входящие вебхуки Altegio пишутся в altegio_events пачками:
+    # одна вставка на batch_size событий или на batch_wait_ms ожидания.
+    altegio_inbox_batch_size: int = 500
+    altegio_inbox_batch_wait_ms: int = 20
+
+    # Пул соединений с БД: размер под ожидаемую конкурентность вебхуков.
+    # При старте приложения db_pool_size соединений открываются заранее.
+    db_pool_size: int = 20
+    db_max_overflow: int = 20
+    db_pool_timeout: float = 30.0
+    db_pool_pre_ping: bool = True
+
+    # skip | sync | async — применять ли миграции Alembic при старте API
+    # (см. altegio_bot.migrations). По умолчанию их применяет шаг деплоя.
+    migration_mode: str = "skip"
+
     whatsapp_provider: str = "dummy"
     allow_real_send: bool = False
     stop_worker_on_token_expired: bool = False
@@ -84,20 +84,10 @@ class _FakeSession:
 
 def test_lock_next_jobs_excludes_execution_job_type() -> None:
     """_lock_next_jobs строит WHERE job_type != CAMPAIGN_EXECUTION_JOB_TYPE."""
-    from sqlalchemy import select
-
-    from altegio_bot.models.models import MessageJob
-
-    # Build a query that mirrors _lock_next_jobs and verify the filter is present.
-    stmt = (
-        select(MessageJob)
-        .where(MessageJob.status == "queued")
-        .where(MessageJob.job_type != CAMPAIGN_EXECUTION_JOB_TYPE)
-        .limit(10)
-    )
-    compiled = str(stmt.compile(compile_kwargs={"literal_binds": True}))
-    assert CAMPAIGN_EXECUTION_JOB_TYPE in compiled
-    assert "!=" in compiled or "!=" in compiled or "<>" in compiled or "NOT" in compiled.upper()
+    compiled = ow._DUE_JOBS_STMT.compile()
+    assert CAMPAIGN_EXECUTION_JOB_TYPE in compiled.params.values()
+    sql = str(compiled)
+    assert "!=" in sql or "<>" in sql or "NOT" in sql.upper()
 
 
 # ---------------------------------------------------------------------------
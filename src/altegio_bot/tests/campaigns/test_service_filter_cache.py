@@ -8,7 +8,16 @@
 
 from __future__ import annotations
 
-from altegio_bot.service_filter import _CACHE_MAX_SIZE, _LRU_CACHE, _cache_get, _cache_put
+from unittest.mock import AsyncMock
+
+from altegio_bot.service_filter import (
+    _CACHE_MAX_SIZE,
+    _LRU_CACHE,
+    LASH_CATEGORY_IDS_BY_COMPANY,
+    _cache_get,
+    _cache_put,
+    record_has_allowed_service,
+)
 
 
 def _clear_cache() -> None:
@@ -108,3 +117,21 @@ def test_cache_size_bounded() -> None:
         _cache_put((1, i), i)
 
     assert len(_LRU_CACHE) <= _CACHE_MAX_SIZE
+
+
+async def test_record_has_allowed_service_uses_known_service_ids() -> None:
+    """Переданные service_ids проверяются по кешу без чтения record_services."""
+    _clear_cache()
+    company_id, categories = next(iter(LASH_CATEGORY_IDS_BY_COMPANY.items()))
+    _cache_put((company_id, 555), next(iter(categories)))
+    session = AsyncMock()
+
+    allowed = await record_has_allowed_service(
+        session,
+        company_id=company_id,
+        record_id=1,
+        service_ids=[555],
+    )
+
+    assert allowed is True
+    session.execute.assert_not_awaited()
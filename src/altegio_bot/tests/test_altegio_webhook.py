@@ -0,0 +1,249 @@
+"""Tests for the Altegio webhook inbox."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+from typing import Any
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from starlette.requests import Request
+
+from altegio_bot.models.models import AltegioEvent
+from altegio_bot.settings import settings
+from altegio_bot.webhooks import altegio as altegio_webhook
+from altegio_bot.webhooks.altegio import _core_fields, _InboxBatcher, _make_dedupe_key, _safe_headers
+
+
+class _FakeSession:
+    def __init__(self, executed: list[Any]) -> None:
+        self._executed = executed
+
+    async def __aenter__(self) -> _FakeSession:
+        return self
+
+    async def __aexit__(self, *exc: object) -> None:
+        return None
+
+    async def execute(self, stmt: Any) -> None:
+        self._executed.append(stmt)
+
+    async def commit(self) -> None:
+        return None
+
+
+def _row(key: str) -> dict[str, Any]:
+    return {
+        "dedupe_key": key,
+        "status": "received",
+        "company_id": 1,
+        "resource": "record",
+        "resource_id": 1,
+        "event_status": "create",
+        "query": {},
+        "headers": {},
+        "payload": {},
+    }
+
+
+def test_dedupe_key_is_stable_for_same_event() -> None:
+    payload = {
+        "company_id": 1,
+        "resource": "record",
+        "resource_id": 5,
+        "status": "update",
+        "data": {"last_change_date": "2026-01-01 10:00:00"},
+    }
+
+    reordered = dict(reversed(payload.items()))
+    key1 = _make_dedupe_key(payload, _core_fields(payload), "s")
+    key2 = _make_dedupe_key(reordered, _core_fields(reordered), "s")
+
+    assert key1 == key2
+    assert len(key1) == 64
+
+
+def test_dedupe_key_fallback_ignores_key_order() -> None:
+    def key(payload: dict[str, Any]) -> str:
+        return _make_dedupe_key(payload, _core_fields(payload), None)
+
+    assert key({"a": 1, "b": "ü"}) == key({"b": "ü", "a": 1})
+    assert key({"a": 1, "b": "ü"}) != key({"a": 2, "b": "ü"})
+
+
+def test_dedupe_key_keeps_stored_sha256_format() -> None:
+    # Stored keys must keep matching redeliveries across deploys.
+    payload = {
+        "company_id": 1,
+        "resource": "record",
+        "resource_id": 5,
+        "status": "update",
+        "data": {"last_change_date": "2026-01-01 10:00:00"},
+    }
+    expected = hashlib.sha256(b"1:record:5:update:2026-01-01 10:00:00:s").hexdigest()
+    assert _make_dedupe_key(payload, _core_fields(payload), "s") == expected
+
+    fallback = {"a": 1, "b": "ü"}
+    canon = '{"a":1,"b":"ü"}'.encode()
+    inner = hashlib.sha256(canon).hexdigest()
+    expected = hashlib.sha256(f"fallback:{inner}".encode()).hexdigest()
+    assert _make_dedupe_key(fallback, _core_fields(fallback), None) == expected
+
+
+def test_dedupe_key_fallback_keeps_stored_float_and_nested_format() -> None:
+    # Stored fallback keys were built from stdlib json text: floats as
+    # 1e+16 / 1.5e-07, nested keys sorted, non-ASCII kept as is.
+    payload = {"b": {"y": 1e16, "x": [1.5e-7, "ü", {"d": 2, "c": None}]}, "a": 12345678901234567890123}
+    canon = '{"a":12345678901234567890123,"b":{"x":[1.5e-07,"ü",{"c":null,"d":2}],"y":1e+16}}'.encode()
+    inner = hashlib.sha256(canon).hexdigest()
+    expected = hashlib.sha256(f"fallback:{inner}".encode()).hexdigest()
+    assert _make_dedupe_key(payload, _core_fields(payload), None) == expected
+
+
+@pytest.mark.asyncio
+async def test_webhook_accepts_payloads_stdlib_json_accepts(monkeypatch: pytest.MonkeyPatch) -> None:
+    stored: list[dict[str, Any]] = []
+
+    async def fake_put(row: dict[str, Any]) -> None:
+        stored.append(row)
+
+    monkeypatch.setattr(altegio_webhook.inbox, "put", fake_put)
+    app = FastAPI()
+    app.include_router(altegio_webhook.router)
+
+    body = (
+        b'{"company_id": 1, "resource": "record", "resource_id": 5, "status": "create", '
+        b'"id": 123456789012345678901234567890, "x": NaN, "s": "\\ud800"}'
+    )
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        res = await client.post(
+            "/webhooks/altegio",
+            params={"secret": settings.altegio_webhook_secret},
+            content=body,
+        )
+
+    assert res.status_code == 200
+    payload = stored[0]["payload"]
+    assert payload["id"] == 123456789012345678901234567890
+    assert isinstance(payload["id"], int)
+    assert payload["s"] == "\ud800"
+
+
+def test_dedupe_key_uses_type_when_resource_missing() -> None:
+    payload = {"company_id": 1, "type": "record", "resource_id": 5, "status": "create"}
+
+    core = _core_fields(payload)
+
+    assert core.resource is None
+    assert _make_dedupe_key(payload, core, "s") != _make_dedupe_key(payload, core, "other")
+
+
+def test_safe_headers_drops_credentials() -> None:
+    request = Request(
+        {
+            "type": "http",
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"authorization", b"Bearer x"),
+                (b"cookie", b"a=b"),
+            ],
+        }
+    )
+
+    assert _safe_headers(request) == {"content-type": "application/json"}
+
+
+@pytest.mark.asyncio
+async def test_inbox_batcher_flushes_concurrent_events_in_one_insert() -> None:
+    executed: list[Any] = []
+    batcher = _InboxBatcher(lambda: _FakeSession(executed), max_batch=10, max_wait_ms=50)  # type: ignore[arg-type]
+
+    try:
+        await asyncio.gather(*(batcher.put(_row(f"k{i}")) for i in range(5)))
+    finally:
+        await batcher.aclose()
+
+    assert len(executed) == 1
+    sql = str(executed[0])
+    assert "ON CONFLICT (dedupe_key) DO NOTHING" in sql
+
+
+@pytest.mark.asyncio
+async def test_inbox_batcher_propagates_db_errors() -> None:
+    class _BrokenSession(_FakeSession):
+        async def execute(self, stmt: Any) -> None:
+            raise RuntimeError("db down")
+
+    batcher = _InboxBatcher(lambda: _BrokenSession([]), max_batch=10, max_wait_ms=1)  # type: ignore[arg-type]
+
+    try:
+        with pytest.raises(RuntimeError, match="db down"):
+            await batcher.put(_row("k"))
+    finally:
+        await batcher.aclose()
+
+
+@pytest.mark.asyncio
+async def test_inbox_batcher_fails_whole_batch_when_db_is_down() -> None:
+    executed: list[Any] = []
+
+    class _BrokenSession(_FakeSession):
+        async def execute(self, stmt: Any) -> None:
+            executed.append(stmt)
+            raise OSError("connection refused")
+
+    batcher = _InboxBatcher(lambda: _BrokenSession([]), max_batch=10, max_wait_ms=50)  # type: ignore[arg-type]
+
+    try:
+        results = await asyncio.gather(*(batcher.put(_row(f"k{i}")) for i in range(3)), return_exceptions=True)
+    finally:
+        await batcher.aclose()
+
+    assert all(isinstance(r, OSError) for r in results)
+    # Без построчного повтора: одна попытка на всю пачку.
+    assert len(executed) == 1
+
+
+@pytest.mark.asyncio
+async def test_inbox_batcher_aclose_fails_pending_requests() -> None:
+    class _HangingSession(_FakeSession):
+        async def execute(self, stmt: Any) -> None:
+            await asyncio.Event().wait()
+
+    batcher = _InboxBatcher(lambda: _HangingSession([]), max_batch=1, max_wait_ms=1)  # type: ignore[arg-type]
+
+    puts = [asyncio.create_task(batcher.put(_row(f"k{i}"))) for i in range(3)]
+    for _ in range(5):
+        await asyncio.sleep(0)
+    await batcher.aclose()
+
+    results = await asyncio.wait_for(asyncio.gather(*puts, return_exceptions=True), timeout=1)
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+@pytest.mark.asyncio
+async def test_inbox_batcher_isolates_bad_row(session_maker: async_sessionmaker) -> None:
+    batcher = _InboxBatcher(session_maker, max_batch=10, max_wait_ms=50)
+    bad = {**_row("bad"), "company_id": "not-a-number"}
+
+    try:
+        results = await asyncio.gather(
+            batcher.put(_row("k1")),
+            batcher.put(bad),
+            batcher.put(_row("k2")),
+            return_exceptions=True,
+        )
+    finally:
+        await batcher.aclose()
+
+    assert results[0] is None
+    assert isinstance(results[1], Exception)
+    assert results[2] is None
+
+    async with session_maker() as session:
+        keys = (await session.execute(select(AltegioEvent.dedupe_key).order_by(AltegioEvent.dedupe_key))).scalars()
+        assert list(keys) == ["k1", "k2"]
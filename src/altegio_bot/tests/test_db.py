@@ -0,0 +1,52 @@
+"""Tests for warming up the DB connection pool."""
+
+from __future__ import annotations
+
+import logging
+from typing import Any
+
+import pytest
+
+from altegio_bot import db
+
+
+class _Conn:
+    def __init__(self, closed: list[int], n: int) -> None:
+        self._closed = closed
+        self._n = n
+
+    async def execute(self, stmt: Any) -> None:
+        return None
+
+    async def close(self) -> None:
+        self._closed.append(self._n)
+
+
+class _Engine:
+    """Каждое второе соединение не открывается."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.closed: list[int] = []
+
+    async def connect(self) -> _Conn:
+        self.calls += 1
+        n = self.calls
+        if n % 2 == 0:
+            raise ConnectionRefusedError("db down")
+        return _Conn(self.closed, n)
+
+
+@pytest.mark.asyncio
+async def test_warm_up_closes_opened_connections_when_some_fail(
+    monkeypatch: pytest.MonkeyPatch, caplog: pytest.LogCaptureFixture
+) -> None:
+    engine = _Engine()
+    monkeypatch.setattr(db, "engine", engine)
+
+    with caplog.at_level(logging.WARNING, logger="altegio_db"):
+        await db.warm_up_pool(size=4)
+
+    assert engine.calls == 4
+    assert sorted(engine.closed) == [1, 3]
+    assert "failed for 2 of 4 connections" in caplog.text
@@ -1,10 +1,17 @@
 from __future__ import annotations
 
+import asyncio
 from datetime import datetime, timezone
 from unittest.mock import AsyncMock, MagicMock, patch
 from zoneinfo import ZoneInfo
 
-from altegio_bot.workers.inbox_worker import _normalize_phone, _parse_starts_at, handle_event, parse_dt
+from altegio_bot.workers import inbox_worker
+from altegio_bot.workers.inbox_worker import (
+    _normalize_phone,
+    _parse_starts_at,
+    handle_event,
+    parse_dt,
+)
 
 
 class TestParseDt:
@@ -286,3 +293,93 @@ class TestHandleEventVisitAttendance:
 
         mock_plan.assert_awaited_once()
         assert mock_plan.await_args.kwargs["source_cancelled_at"] == datetime(2026, 4, 1, 12, 0, tzinfo=timezone.utc)
+
+
+class _BeginCM:
+    async def __aenter__(self) -> None:
+        return None
+
+    async def __aexit__(self, *exc: object) -> None:
+        return None
+
+
+class _SessionCM:
+    async def __aenter__(self) -> MagicMock:
+        session = MagicMock()
+        session.begin = _BeginCM
+        return session
+
+    async def __aexit__(self, *exc: object) -> None:
+        return None
+
+
+class TestRunLoopOrdering:
+    """Events of a locked batch are processed one after another, in order."""
+
+    async def test_client_less_deletes_of_one_client_do_not_overlap(self, monkeypatch):
+        # Две записи одного клиента удалены, в payload клиента нет.
+        # comeback_3d проверяется по закоммиченным задачам, поэтому
+        # второе событие должно начаться только после первого.
+        events = []
+        for event_id, record_id in ((1, 5), (2, 6)):
+            event = MagicMock()
+            event.id = event_id
+            event.company_id = 1
+            event.resource = "record"
+            event.resource_id = record_id
+            event.event_status = "delete"
+            event.payload = {"data": {"id": record_id}}
+            events.append(event)
+
+        async def fake_lock_next_batch(session, batch_size):
+            return events
+
+        active = 0
+        calls: list[int] = []
+
+        async def fake_process(eid: int) -> None:
+            nonlocal active
+            active += 1
+            assert active == 1, "events of one client must not run concurrently"
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+            calls.append(eid)
+            active -= 1
+            if len(calls) == len(events):
+                raise asyncio.CancelledError
+
+        monkeypatch.setattr(inbox_worker, "SessionLocal", _SessionCM)
+        monkeypatch.setattr(inbox_worker, "lock_next_batch", fake_lock_next_batch)
+        monkeypatch.setattr(inbox_worker, "process_one_event", fake_process)
+
+        try:
+            await inbox_worker.run_loop(batch_size=50, poll_sec=1.0)
+            raise AssertionError("Expected CancelledError")
+        except asyncio.CancelledError:
+            pass
+
+        assert calls == [1, 2]
+
+
+class TestHandleEventUnknownStatus:
+    async def test_unknown_status_skips_service_lookup(self):
+        event = MagicMock()
+        event.id = 1
+        event.company_id = 123
+        event.resource = "record"
+        event.resource_id = 42
+        event.event_status = "attendance_changed"
+        event.payload = {"data": {"id": 42, "services": []}}
+        session = AsyncMock()
+
+        with (
+            patch("altegio_bot.workers.inbox_worker.upsert_record", new=AsyncMock(return_value=99)),
+            patch("altegio_bot.workers.inbox_worker.replace_record_services", new=AsyncMock()),
+            patch("altegio_bot.workers.inbox_worker.record_has_allowed_service", new=AsyncMock()) as mock_allowed,
+            patch("altegio_bot.workers.inbox_worker.plan_jobs_for_record_event", new=AsyncMock()) as mock_plan,
+        ):
+            await handle_event(session, event)
+
+        mock_allowed.assert_not_awaited()
+        mock_plan.assert_not_awaited()
+        session.get.assert_not_awaited()
@@ -198,6 +198,119 @@ async def test_update_reschedules_system_jobs(session_maker):
         )
 
 
+@pytest.mark.asyncio
+async def test_update_with_same_start_keeps_replanned_reminders_queued(session_maker):
+    now = utcnow()
+
+    async with session_maker() as session:
+        async with session.begin():
+            record = Record(
+                company_id=1,
+                altegio_record_id=111,
+                client_id=10,
+                staff_name="Staff",
+                starts_at=now + timedelta(hours=25),
+            )
+            session.add(record)
+            await session.flush()
+
+            await plan_jobs_for_record_event(
+                session,
+                company_id=record.company_id,
+                record_id=record.id,
+                event_status="create",
+            )
+
+        reminders_stmt = (
+            select(MessageJob.id, MessageJob.updated_at)
+            .where(MessageJob.job_type.in_(["reminder_24h", "reminder_2h"]))
+            .order_by(MessageJob.id.asc())
+        )
+        async with session.begin():
+            reminders_before = (await session.execute(reminders_stmt)).all()
+
+        async with session.begin():
+            await plan_jobs_for_record_event(
+                session,
+                company_id=record.company_id,
+                record_id=record.id,
+                event_status="update",
+            )
+
+        jobs = (await session.execute(select(MessageJob).order_by(MessageJob.id.asc()))).scalars().all()
+
+        canceled = [j.job_type for j in jobs if j.status == "canceled"]
+        queued = [j.job_type for j in jobs if j.status == "queued"]
+
+        # Re-planning an unchanged start neither cancels nor rewrites the
+        # reminders: the upsert hits their dedupe keys and does nothing.
+        assert (await session.execute(reminders_stmt)).all() == reminders_before
+        assert canceled == ["record_created"]
+        assert sorted(queued) == sorted(
+            [
+                "record_updated",
+                "reminder_24h",
+                "reminder_2h",
+                "review_3d",
+                "repeat_10d",
+            ]
+        )
+
+
+@pytest.mark.asyncio
+async def test_update_back_to_original_start_requeues_canceled_reminders(session_maker):
+    now = utcnow()
+    original_start = now + timedelta(hours=25)
+
+    async with session_maker() as session:
+        async with session.begin():
+            record = Record(
+                company_id=1,
+                altegio_record_id=111,
+                client_id=10,
+                staff_name="Staff",
+                starts_at=original_start,
+            )
+            session.add(record)
+            await session.flush()
+
+            await plan_jobs_for_record_event(
+                session,
+                company_id=record.company_id,
+                record_id=record.id,
+                event_status="create",
+            )
+
+        for starts_at in (now + timedelta(hours=30), original_start):
+            async with session.begin():
+                record.starts_at = starts_at
+                await session.flush()
+
+                await plan_jobs_for_record_event(
+                    session,
+                    company_id=record.company_id,
+                    record_id=record.id,
+                    event_status="update",
+                )
+
+        reminders = (
+            await session.execute(
+                select(MessageJob.job_type, MessageJob.run_at, MessageJob.status)
+                .where(MessageJob.job_type.in_(["reminder_24h", "reminder_2h"]))
+                .order_by(MessageJob.id.asc())
+            )
+        ).all()
+
+        # The original rows are requeued in place; the moved ones are canceled.
+        assert [(r.job_type, r.status) for r in reminders] == [
+            ("reminder_24h", "queued"),
+            ("reminder_2h", "queued"),
+            ("reminder_24h", "canceled"),
+            ("reminder_2h", "canceled"),
+        ]
+        assert reminders[0].run_at == original_start - timedelta(hours=24)
+
+
 @pytest.mark.asyncio
 async def test_delete_cancels_future_jobs_and_schedules_canceled_and_comeback(
     session_maker,
@@ -258,3 +371,125 @@ async def test_delete_cancels_future_jobs_and_schedules_canceled_and_comeback(
         comeback = [j for j in jobs if j.job_type == "comeback_3d"][0]
         assert comeback.run_at == cancelled_at + timedelta(days=3)
         assert comeback.payload["source_cancelled_at"] == cancelled_at.isoformat()
+
+
+@pytest.mark.asyncio
+async def test_add_jobs_requeues_canceled_and_keeps_queued(session_maker):
+    run_at = utcnow() + timedelta(days=1)
+
+    def row(job_type: str, payload: dict) -> dict:
+        return planner_mod.build_job_row(
+            company_id=1,
+            record_id=None,
+            client_id=10,
+            job_type=job_type,
+            run_at=run_at,
+            payload=payload,
+        )
+
+    async with session_maker() as session:
+        async with session.begin():
+            await planner_mod.add_jobs(session, [row("repeat_10d", {"v": 1}), row("review_3d", {"v": 1})])
+            review = (await session.execute(select(MessageJob).where(MessageJob.job_type == "review_3d"))).scalar_one()
+            review.status = "canceled"
+            review.last_error = "record deleted"
+
+        async with session.begin():
+            await planner_mod.add_jobs(
+                session,
+                [
+                    row("repeat_10d", {"v": 2}),
+                    row("review_3d", {"v": 2}),
+                    row("comeback_3d", {"v": 2}),
+                ],
+            )
+
+        session.expire_all()
+        jobs = {j.job_type: j for j in (await session.execute(select(MessageJob))).scalars().all()}
+
+    assert {t: (j.status, j.payload) for t, j in jobs.items()} == {
+        "repeat_10d": ("queued", {"v": 1}),
+        "review_3d": ("queued", {"v": 2}),
+        "comeback_3d": ("queued", {"v": 2}),
+    }
+    assert jobs["review_3d"].last_error is None
+
+
+@pytest.mark.asyncio
+async def test_delete_skips_comeback_when_other_record_has_one_queued(session_maker):
+    now = utcnow()
+
+    async with session_maker() as session:
+        async with session.begin():
+            first = Record(company_id=1, altegio_record_id=111, client_id=10, staff_name="Staff", starts_at=now)
+            second = Record(company_id=1, altegio_record_id=222, client_id=10, staff_name="Staff", starts_at=now)
+            session.add_all([first, second])
+            await session.flush()
+
+        for record in (first, second):
+            async with session.begin():
+                await plan_jobs_for_record_event(
+                    session,
+                    company_id=1,
+                    record_id=record.id,
+                    event_status="delete",
+                    source_cancelled_at=now,
+                )
+
+        comebacks = (
+            (await session.execute(select(MessageJob.record_id).where(MessageJob.job_type == "comeback_3d")))
+            .scalars()
+            .all()
+        )
+        canceled = (
+            (await session.execute(select(MessageJob.record_id).where(MessageJob.job_type == "record_canceled")))
+            .scalars()
+            .all()
+        )
+
+    assert comebacks == [first.id]
+    assert sorted(canceled) == sorted([first.id, second.id])
+
+
+def test_make_dedupe_key_format_is_stable():
+    run_at = datetime(2026, 1, 2, 10, 30, tzinfo=timezone.utc)
+
+    assert (
+        planner_mod.make_dedupe_key(job_type="reminder_24h", company_id=1, record_id=5, run_at=run_at)
+        == "reminder_24h:1:5:2026-01-02T10:30:00+00:00"
+    )
+    assert (
+        planner_mod.make_dedupe_key(job_type="repeat_10d", company_id=1, record_id=None, run_at=run_at)
+        == "repeat_10d:1:0:2026-01-02T10:30:00+00:00"
+    )
+
+
+@pytest.mark.asyncio
+async def test_injected_now_drives_scheduling(session_maker):
+    now = datetime(2030, 1, 1, 9, 0, 0, 123456, tzinfo=timezone.utc)
+
+    async with session_maker() as session:
+        async with session.begin():
+            record = Record(
+                company_id=1,
+                altegio_record_id=111,
+                client_id=10,
+                staff_name="Staff",
+                starts_at=now + timedelta(hours=1),
+            )
+            session.add(record)
+            await session.flush()
+
+            await plan_jobs_for_record_event(
+                session,
+                company_id=record.company_id,
+                record_id=record.id,
+                event_status="create",
+                now=now,
+            )
+
+        created = (
+            await session.execute(select(MessageJob).where(MessageJob.job_type == "record_created"))
+        ).scalar_one()
+
+        assert created.run_at == now.replace(microsecond=0)
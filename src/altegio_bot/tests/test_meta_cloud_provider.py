@@ -0,0 +1,47 @@
+"""Tests for MetaCloudProvider helpers."""
+
+from __future__ import annotations
+
+from typing import Any
+
+import pytest
+
+from altegio_bot.models.models import WhatsAppSender
+from altegio_bot.providers import meta_cloud
+from altegio_bot.providers.meta_cloud import MetaCloudProvider
+
+
+@pytest.mark.asyncio
+async def test_warm_sender_cache_loads_active_senders(monkeypatch: pytest.MonkeyPatch, session_maker: Any) -> None:
+    async with session_maker() as session:
+        async with session.begin():
+            session.add_all(
+                [
+                    WhatsAppSender(id=1, company_id=1, sender_code="default", phone_number_id="111", is_active=True),
+                    WhatsAppSender(id=2, company_id=1, sender_code="lashes", phone_number_id="222", is_active=True),
+                    WhatsAppSender(id=3, company_id=1, sender_code="old", phone_number_id="333", is_active=False),
+                ]
+            )
+
+    monkeypatch.setattr(meta_cloud, "SessionLocal", session_maker)
+    provider = MetaCloudProvider(access_token="test-token")
+    try:
+        assert await provider.warm_sender_cache() == 2
+        assert provider._sender_cache == {1: "111", 2: "222"}
+
+        # Inactive senders are still resolved on demand.
+        assert await provider._get_phone_number_id(3) == "333"
+    finally:
+        await provider.aclose()
+
+
+@pytest.mark.parametrize(
+    ("raw", "expected"),
+    [
+        ("+491234567890", "491234567890"),
+        ("491234567890", "491234567890"),
+        (" +491234567890 ", "491234567890"),
+    ],
+)
+def test_strip_plus(raw: str, expected: str) -> None:
+    assert meta_cloud._strip_plus(raw) == expected
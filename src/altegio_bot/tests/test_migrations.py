@@ -0,0 +1,176 @@
+"""Tests for applying Alembic migrations at app startup."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator
+
+import pytest
+import pytest_asyncio
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from alembic import command
+from altegio_bot import migrations
+
+
+@pytest.fixture
+def upgrades(monkeypatch: pytest.MonkeyPatch, engine: AsyncEngine) -> list[str]:
+    calls: list[str] = []
+    monkeypatch.setattr(migrations, "engine", engine)
+    monkeypatch.setattr(migrations, "_status", "skipped")
+    monkeypatch.setattr(migrations, "_upgrade_head", lambda: calls.append("head"))
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_skip_mode_does_not_migrate(upgrades: list[str]) -> None:
+    assert await migrations.start_migrations("skip") is None
+
+    assert upgrades == []
+    assert migrations.migration_status() == "skipped"
+
+
+@pytest.mark.asyncio
+async def test_async_mode_upgrades_in_background(upgrades: list[str]) -> None:
+    task = await migrations.start_migrations("async")
+    assert task is not None
+    await task
+
+    assert upgrades == ["head"]
+    assert migrations.migration_status() == "succeeded"
+
+
+@pytest.mark.asyncio
+async def test_failed_sync_upgrade_aborts_startup(monkeypatch: pytest.MonkeyPatch, upgrades: list[str]) -> None:
+    def broken() -> None:
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(migrations, "_upgrade_head", broken)
+
+    with pytest.raises(RuntimeError, match="boom"):
+        await migrations.start_migrations("sync")
+
+    assert migrations.migration_status() == "failed"
+
+
+@pytest.mark.asyncio
+async def test_failed_async_upgrade_is_reported(monkeypatch: pytest.MonkeyPatch, upgrades: list[str]) -> None:
+    def broken() -> None:
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(migrations, "_upgrade_head", broken)
+
+    task = await migrations.start_migrations("async")
+    assert task is not None
+    await task
+
+    assert migrations.migration_status() == "failed"
+
+
+@pytest.mark.asyncio
+async def test_sync_replica_waits_for_lock_then_upgrades(engine: AsyncEngine, upgrades: list[str]) -> None:
+    async with engine.connect() as holder:
+        await holder.execute(text("SELECT pg_advisory_lock(:id)"), {"id": migrations.MIGRATION_LOCK_ID})
+        try:
+            task = asyncio.create_task(migrations.start_migrations("sync"))
+            await asyncio.sleep(0.5)
+            # Пока другая реплика мигрирует, старт стоит.
+            assert not task.done()
+            assert upgrades == []
+        finally:
+            await holder.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": migrations.MIGRATION_LOCK_ID})
+
+        assert await asyncio.wait_for(task, timeout=10) is None
+
+    assert upgrades == ["head"]
+    assert migrations.migration_status() == "succeeded"
+
+
+@pytest.mark.asyncio
+async def test_replica_without_lock_skips(engine: AsyncEngine, upgrades: list[str]) -> None:
+    async with engine.connect() as holder:
+        await holder.execute(text("SELECT pg_advisory_lock(:id)"), {"id": migrations.MIGRATION_LOCK_ID})
+        try:
+            await migrations.run_migrations()
+        finally:
+            await holder.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": migrations.MIGRATION_LOCK_ID})
+
+    assert upgrades == []
+    assert migrations.migration_status() == "skipped"
+
+
+def _alembic_config() -> Config:
+    return Config(str(migrations.ALEMBIC_INI))
+
+
+async def _alembic_upgrade(revision: str) -> None:
+    # env.py сам вызывает asyncio.run(), поэтому запускаем в отдельном потоке.
+    await asyncio.to_thread(command.upgrade, _alembic_config(), revision)
+
+
+async def _dedupe_indexes(engine: AsyncEngine) -> list[tuple[str, bool, bool]]:
+    """(имя, unique, valid) индексов altegio_events по dedupe_key."""
+    async with engine.connect() as conn:
+        rows = await conn.execute(
+            text(
+                "SELECT c.relname, i.indisunique, i.indisvalid FROM pg_index i "
+                "JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE c.relname LIKE 'ix_altegio_events_dedupe_key%' ORDER BY c.relname"
+            )
+        )
+        return [tuple(r) for r in rows]
+
+
+async def _reset_schema(engine: AsyncEngine) -> None:
+    async with engine.begin() as conn:
+        await conn.execute(text("DROP SCHEMA public CASCADE"))
+        await conn.execute(text("CREATE SCHEMA public"))
+
+
+@pytest_asyncio.fixture
+async def empty_db(engine: AsyncEngine) -> AsyncIterator[AsyncEngine]:
+    """Пустая схема для прогона миграций; после теста — снова пустая."""
+    await _reset_schema(engine)
+    try:
+        yield engine
+    finally:
+        await _reset_schema(engine)
+
+
+@pytest.mark.asyncio
+async def test_upgrade_head_on_empty_database(empty_db: AsyncEngine) -> None:
+    await _alembic_upgrade("head")
+
+    async with empty_db.connect() as conn:
+        versions = set((await conn.execute(text("SELECT version_num FROM alembic_version"))).scalars())
+
+    assert versions == set(ScriptDirectory.from_config(_alembic_config()).get_heads())
+    assert await _dedupe_indexes(empty_db) == [("ix_altegio_events_dedupe_key", True, True)]
+
+
+@pytest.mark.asyncio
+async def test_upgrade_dedupes_altegio_events_and_restores_unique_index(empty_db: AsyncEngine) -> None:
+    await _alembic_upgrade("e8f9a0b1c2d3")
+
+    # Дубли могут появиться только без уникального индекса.
+    async with empty_db.begin() as conn:
+        await conn.execute(text("DROP INDEX ix_altegio_events_dedupe_key"))
+        await conn.execute(text("CREATE INDEX ix_altegio_events_dedupe_key ON altegio_events (dedupe_key)"))
+        await conn.execute(
+            text(
+                "INSERT INTO altegio_events (dedupe_key, status, query, headers, payload) "
+                "SELECT k, 'received', '{}', '{}', '{}' FROM unnest(ARRAY['a', 'b', 'a', 'a']) AS k"
+            )
+        )
+
+    await _alembic_upgrade("head")
+
+    async with empty_db.connect() as conn:
+        rows = (await conn.execute(text("SELECT id, dedupe_key FROM altegio_events ORDER BY id"))).all()
+
+    assert [tuple(r) for r in rows] == [(1, "a"), (2, "b")]
+    # Уникальный индекс собран под временным именем и переименован.
+    assert await _dedupe_indexes(empty_db) == [("ix_altegio_events_dedupe_key", True, True)]
@@ -35,6 +35,7 @@ from dataclasses import dataclass, field
 from typing import Any
 from unittest.mock import AsyncMock, MagicMock
 
+import orjson
 import pytest
 
 import altegio_bot.workers.outbox_worker as ow
@@ -946,13 +947,11 @@ async def test_meta_cloud_send_template_includes_header_component_when_url_set()
 
     class FakeResp:
         status_code = 200
-
-        def json(self) -> dict:
-            return {"messages": [{"id": "wamid.testHEADER"}]}
+        content = b'{"messages": [{"id": "wamid.testHEADER"}]}'
 
     class FakeClient:
-        async def post(self, url: str, headers: dict, json: dict) -> FakeResp:
-            captured_payload.append(json)
+        async def post(self, url: str, headers: dict, content: bytes) -> FakeResp:
+            captured_payload.append(orjson.loads(content))
             return FakeResp()
 
     provider._client = FakeClient()  # type: ignore[assignment]
@@ -991,13 +990,11 @@ async def test_meta_cloud_send_template_omits_header_component_when_url_none() -
 
     class FakeResp:
         status_code = 200
-
-        def json(self) -> dict:
-            return {"messages": [{"id": "wamid.testNOHEADER"}]}
+        content = b'{"messages": [{"id": "wamid.testNOHEADER"}]}'
 
     class FakeClient:
-        async def post(self, url: str, headers: dict, json: dict) -> FakeResp:
-            captured_payload.append(json)
+        async def post(self, url: str, headers: dict, content: bytes) -> FakeResp:
+            captured_payload.append(orjson.loads(content))
             return FakeResp()
 
     provider._client = FakeClient()  # type: ignore[assignment]
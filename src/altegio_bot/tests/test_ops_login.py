@@ -52,7 +52,7 @@ async def test_health_endpoint_responds(client: AsyncClient) -> None:
     """
     response = await client.get("/health")
     assert response.status_code == 200
-    assert response.json() == {"ok": True}
+    assert response.json() == {"ok": True, "migration": "skipped"}
 
 
 @pytest.mark.asyncio
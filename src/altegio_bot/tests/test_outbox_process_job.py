@@ -5,6 +5,10 @@ from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from typing import Any
 
+import pytest
+from sqlalchemy import event
+
+from altegio_bot.models.models import Client, Record
 from altegio_bot.workers import outbox_worker as ow
 
 
@@ -585,3 +589,41 @@ def test_process_job_sends_text_when_mode_is_text(
     assert out.status == "sent"
     assert out.provider_message_id == "msg-text"
     assert out.meta == {"send_type": "text"}
+
+
+@pytest.mark.asyncio
+async def test_load_record_brings_client_without_extra_query(engine: Any, session_maker: Any) -> None:
+    statements: list[str] = []
+
+    def _count(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+        statements.append(statement)
+
+    async with session_maker() as session:
+        async with session.begin():
+            client = Client(company_id=1, altegio_client_id=501, display_name="Anna", phone_e164="+491234567890")
+            session.add(client)
+            await session.flush()
+            record = Record(company_id=1, altegio_record_id=601, client_id=client.id)
+            session.add(record)
+            await session.flush()
+            record_id, client_id = record.id, client.id
+
+    async with session_maker() as session:
+        job = FakeJob(
+            id=1,
+            company_id=1,
+            job_type="reminder_24h",
+            status="processing",
+            run_at=datetime.now(timezone.utc),
+            record_id=record_id,
+            client_id=client_id,
+        )
+        event.listen(engine.sync_engine, "before_cursor_execute", _count)
+        try:
+            loaded_record = await ow._load_record(session, job)  # type: ignore[arg-type]
+            loaded_client = await ow._load_client(session, job, loaded_record)  # type: ignore[arg-type]
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", _count)
+
+    assert loaded_client is not None and loaded_client.id == client_id
+    assert len([s for s in statements if s.lstrip().upper().startswith("SELECT")]) == 1
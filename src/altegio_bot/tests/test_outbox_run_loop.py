@@ -110,3 +110,30 @@ def test_run_loop_processes_job_ids(monkeypatch: Any) -> None:
         pass
 
     assert calls == [10, 11, 12]
+
+
+def test_worker_closes_provider_when_warm_up_fails(monkeypatch: Any) -> None:
+    from altegio_bot.scripts import run_outbox_worker
+
+    closed: list[bool] = []
+
+    class Provider:
+        async def warm_sender_cache(self) -> None:
+            raise ConnectionError("db down")
+
+        async def aclose(self) -> None:
+            closed.append(True)
+
+    async def fake_run_loop(**kwargs: Any) -> None:
+        raise AssertionError("run_loop must not start")
+
+    monkeypatch.setattr(run_outbox_worker, "get_provider", Provider)
+    monkeypatch.setattr(run_outbox_worker, "run_loop", fake_run_loop)
+
+    try:
+        asyncio.run(run_outbox_worker.main())
+        raise AssertionError("Expected ConnectionError")
+    except ConnectionError:
+        pass
+
+    assert closed == [True]
@@ -577,16 +577,29 @@ def test_worker_fails_review_3d_on_api_error_after_max_guard_attempts(
 
 
 # ─────────────────────────────────────────────────────────────────────
-# Planner tests (add_job + count_attended_client_visits patched)
+# Planner tests (_write_record_jobs + count_attended_client_visits patched)
 # ─────────────────────────────────────────────────────────────────────
 
 # starts_at far enough ahead so review_at (starts_at+3d) > FIXED_NOW.
 FUTURE_STARTS_AT = datetime(2026, 3, 15, 10, 0, tzinfo=timezone.utc)
 
 
+class _PlannerFakeResult:
+    def __init__(self, row: tuple[Any, ...] | None) -> None:
+        self._row = row
+
+    def first(self) -> tuple[Any, ...] | None:
+        return self._row
+
+
 class _PlannerFakeSession:
     """Minimal async session for planner tests."""
 
+    async def execute(self, stmt: Any) -> _PlannerFakeResult:
+        # The planner reads only (id, company_id, client_id, starts_at)
+        # of the record.
+        return _PlannerFakeResult((10, COMPANY_ID, CLIENT_ID, FUTURE_STARTS_AT))
+
     async def get(self, model: Any, pk: Any) -> Any:
         if getattr(model, "__tablename__", None) == "records":
             return FakeRecord(
@@ -606,15 +619,15 @@ def test_planner_does_not_schedule_review_3d_when_visits_over_limit(
     Altegio count > MAX_VISITS_FOR_REVIEW."""
     scheduled: list[str] = []
 
-    async def fake_add_job(
+    async def fake_write_record_jobs(
         session: Any,
         *,
-        job_type: str,
+        rows: list[dict[str, Any]],
         **kwargs: Any,
     ) -> None:
-        scheduled.append(job_type)
+        scheduled.extend(row["job_type"] for row in rows)
 
-    monkeypatch.setattr(planner, "add_job", fake_add_job)
+    monkeypatch.setattr(planner, "_write_record_jobs", fake_write_record_jobs)
     monkeypatch.setattr(
         planner,
         "count_attended_client_visits",
@@ -642,15 +655,15 @@ def test_planner_schedules_review_3d_when_visits_at_limit(
     Altegio count == MAX_VISITS_FOR_REVIEW."""
     scheduled: list[str] = []
 
-    async def fake_add_job(
+    async def fake_write_record_jobs(
         session: Any,
         *,
-        job_type: str,
+        rows: list[dict[str, Any]],
         **kwargs: Any,
     ) -> None:
-        scheduled.append(job_type)
+        scheduled.extend(row["job_type"] for row in rows)
 
-    monkeypatch.setattr(planner, "add_job", fake_add_job)
+    monkeypatch.setattr(planner, "_write_record_jobs", fake_write_record_jobs)
     monkeypatch.setattr(
         planner,
         "count_attended_client_visits",
@@ -688,15 +701,15 @@ def test_planner_skips_review_3d_when_no_altegio_client_id(
                 )
             return await super().get(model, pk)
 
-    async def fake_add_job(
+    async def fake_write_record_jobs(
         session: Any,
         *,
-        job_type: str,
+        rows: list[dict[str, Any]],
         **kwargs: Any,
     ) -> None:
-        scheduled.append(job_type)
+        scheduled.extend(row["job_type"] for row in rows)
 
-    monkeypatch.setattr(planner, "add_job", fake_add_job)
+    monkeypatch.setattr(planner, "_write_record_jobs", fake_write_record_jobs)
     monkeypatch.setattr(
         planner,
         "count_attended_client_visits",
@@ -736,15 +749,15 @@ def test_planner_follows_altegio_api_not_local_records(
     """
     scheduled: list[str] = []
 
-    async def fake_add_job(
+    async def fake_write_record_jobs(
         session: Any,
         *,
-        job_type: str,
+        rows: list[dict[str, Any]],
         **kwargs: Any,
     ) -> None:
-        scheduled.append(job_type)
+        scheduled.extend(row["job_type"] for row in rows)
 
-    monkeypatch.setattr(planner, "add_job", fake_add_job)
+    monkeypatch.setattr(planner, "_write_record_jobs", fake_write_record_jobs)
     # Altegio API: 19 real visits (above MAX_VISITS_FOR_REVIEW=3)
     monkeypatch.setattr(
         planner,
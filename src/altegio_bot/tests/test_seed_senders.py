@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from altegio_bot.models.models import ServiceSenderRule, WhatsAppSender
+from altegio_bot.scripts import seed_all
+from altegio_bot.scripts.seed_senders import upsert_rules, upsert_senders
+
+
+@pytest.mark.asyncio
+async def test_upserts_insert_then_update_in_place(session_maker: async_sessionmaker) -> None:
+    sender = {
+        "company_id": 1,
+        "sender_code": "default",
+        "phone_number_id": "PN_1",
+        "display_phone": "+491700000001",
+    }
+    rule = {"company_id": 1, "service_id": 10, "sender_code": "default"}
+
+    async with session_maker() as session:
+        async with session.begin():
+            await upsert_senders(session, [sender])
+            await upsert_rules(session, [rule])
+
+    async with session_maker() as session:
+        async with session.begin():
+            await session.execute(WhatsAppSender.__table__.update().values(is_active=False))
+            await upsert_senders(session, [{**sender, "phone_number_id": "PN_2"}])
+            await upsert_rules(session, [{**rule, "sender_code": "nails"}])
+
+    async with session_maker() as session:
+        senders = (await session.execute(select(WhatsAppSender))).scalars().all()
+        rules = (await session.execute(select(ServiceSenderRule))).scalars().all()
+
+    assert [(s.phone_number_id, s.is_active) for s in senders] == [("PN_2", True)]
+    assert [r.sender_code for r in rules] == ["nails"]
+
+
+@pytest.mark.asyncio
+async def test_repeated_seed_skips_unchanged_rows(session_maker: async_sessionmaker) -> None:
+    senders = [{"company_id": 1, "sender_code": "default", "phone_number_id": "PN_1", "display_phone": None}]
+    rules = [{"company_id": 1, "service_id": 10, "sender_code": "default"}]
+
+    async with session_maker() as session:
+        async with session.begin():
+            assert await upsert_senders(session, senders) == 1
+            assert await upsert_rules(session, rules) == 1
+
+    async with session_maker() as session:
+        async with session.begin():
+            assert await upsert_senders(session, senders) == 0
+            assert await upsert_rules(session, rules) == 0
+
+
+@pytest.mark.asyncio
+async def test_seed_all_stops_after_failed_seed(monkeypatch: pytest.MonkeyPatch) -> None:
+    calls: list[str] = []
+
+    async def failing_senders() -> None:
+        calls.append("senders")
+        raise RuntimeError("db down")
+
+    async def templates() -> None:
+        calls.append("templates")
+
+    monkeypatch.setattr(seed_all.seed_senders, "main", failing_senders)
+    monkeypatch.setattr(seed_all.seed_templates, "main", templates)
+
+    with pytest.raises(RuntimeError, match="db down"):
+        await seed_all.main()
+
+    assert calls == ["senders"]
@@ -0,0 +1,294 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+from typing import Any, NamedTuple
+
+from fastapi import APIRouter, HTTPException, Request
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import DataError, DBAPIError, IntegrityError, StatementError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from altegio_bot.db import SessionLocal
+from altegio_bot.models.models import AltegioEvent
+from altegio_bot.settings import settings
+
+logger = logging.getLogger("altegio_webhook")
+
+router = APIRouter()
+
+
+class _InboxBatcher:
+    """Пишет входящие вебхуки Altegio пачками.
+
+    Обработчик кладёт строку в очередь и ждёт, пока фоновая задача не
+    закоммитит её вместе с соседними запросами одним
+    ``INSERT ... ON CONFLICT (dedupe_key) DO NOTHING``. Ответ 200 уходит
+    только после коммита, так что при сбое БД Altegio повторит доставку.
+    Если пачка не вставилась из-за данных какой-то строки, строки пишутся
+    по одной, и ошибку получает только запрос с проблемной строкой. Любая
+    другая ошибка (например, БД недоступна) сразу достаётся всей пачке.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        *,
+        max_batch: int,
+        max_wait_ms: int,
+    ) -> None:
+        self._session_factory = session_factory
+        self._max_batch = max_batch
+        self._max_wait = max_wait_ms / 1000
+        self._queue: asyncio.Queue[tuple[dict[str, Any], asyncio.Future[None]]] | None = None
+        self._task: asyncio.Task[None] | None = None
+        self._batch: list[tuple[dict[str, Any], asyncio.Future[None]]] = []
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def _ensure_started(self) -> asyncio.Queue[tuple[dict[str, Any], asyncio.Future[None]]]:
+        loop = asyncio.get_running_loop()
+        if self._queue is None or self._task is None or self._task.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._task = loop.create_task(self._run(self._queue))
+        return self._queue
+
+    async def put(self, row: dict[str, Any]) -> None:
+        queue = self._ensure_started()
+        fut: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        await queue.put((row, fut))
+        await fut
+
+    async def _drain(
+        self,
+        queue: asyncio.Queue[tuple[dict[str, Any], asyncio.Future[None]]],
+        batch: list[tuple[dict[str, Any], asyncio.Future[None]]],
+    ) -> None:
+        # Пачка наполняется на месте: при остановке aclose() видит всё,
+        # что уже вынуто из очереди, и не оставляет обработчики висеть.
+        batch.append(await queue.get())
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self._max_wait
+        while len(batch) < self._max_batch:
+            if not queue.empty():
+                batch.append(queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout))
+            except TimeoutError:
+                break
+
+    async def _flush(self, rows: list[dict[str, Any]]) -> None:
+        stmt = pg_insert(AltegioEvent).values(rows)
+        # Дубликат вебхука — не ошибка (идемпотентность), его просто пропускаем.
+        stmt = stmt.on_conflict_do_nothing(index_elements=[AltegioEvent.dedupe_key])
+        async with self._session_factory() as session:
+            await session.execute(stmt)
+            await session.commit()
+
+    async def _run(
+        self,
+        queue: asyncio.Queue[tuple[dict[str, Any], asyncio.Future[None]]],
+    ) -> None:
+        while True:
+            batch: list[tuple[dict[str, Any], asyncio.Future[None]]] = []
+            self._batch = batch
+            await self._drain(queue, batch)
+            try:
+                await self._flush([row for row, _ in batch])
+            except Exception as exc:
+                if len(batch) == 1 or not _is_row_error(exc):
+                    # БД недоступна или пачка упала целиком не из-за данных:
+                    # построчный повтор только задержит все остальные вебхуки.
+                    for row, fut in batch:
+                        self._fail(row, fut, exc)
+                    continue
+                # Одна плохая строка не должна ронять соседние запросы:
+                # повторяем пачку построчно, ошибку получает только её автор.
+                logger.warning("Batch insert of %d altegio events failed, retrying one by one", len(batch))
+                for row, fut in batch:
+                    await self._flush_one(row, fut)
+            else:
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_result(None)
+
+    async def _flush_one(self, row: dict[str, Any], fut: asyncio.Future[None]) -> None:
+        try:
+            await self._flush([row])
+        except Exception as exc:
+            self._fail(row, fut, exc)
+        else:
+            if not fut.done():
+                fut.set_result(None)
+
+    @staticmethod
+    def _fail(row: dict[str, Any], fut: asyncio.Future[None], exc: Exception) -> None:
+        logger.error("Failed to store altegio event dedupe_key=%s", row.get("dedupe_key"), exc_info=exc)
+        if not fut.done():
+            fut.set_exception(exc)
+
+    async def aclose(self) -> None:
+        task, self._task = self._task, None
+        queue, self._queue = self._queue, None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+        # Запросы, которые остались в очереди или в недописанной пачке,
+        # получают ошибку (500), и Altegio повторит доставку.
+        pending = self._batch
+        self._batch = []
+        if queue is not None:
+            while not queue.empty():
+                pending.append(queue.get_nowait())
+        exc = RuntimeError("Altegio inbox batcher is closed")
+        for _, fut in pending:
+            if not fut.done():
+                fut.set_exception(exc)
+
+
+def _is_row_error(exc: Exception) -> bool:
+    """Упала ли пачка из-за данных одной из строк, а не из-за самой БД."""
+    if isinstance(exc, (IntegrityError, DataError)):
+        return True
+    if isinstance(exc, DBAPIError):
+        sqlstate = getattr(exc.orig, "sqlstate", None)
+        if sqlstate is not None:
+            # 22 — data exception, 23 — integrity constraint violation.
+            return sqlstate[:2] in ("22", "23")
+        # asyncpg проверяет типы параметров на клиенте и бросает ValueError.
+        return isinstance(exc.orig.__cause__, ValueError)
+    if isinstance(exc, StatementError):
+        # Ошибка подготовки параметров строки (например, сериализации JSON).
+        return isinstance(exc.orig, (TypeError, ValueError))
+    return False
+
+
+inbox = _InboxBatcher(
+    SessionLocal,
+    max_batch=settings.altegio_inbox_batch_size,
+    max_wait_ms=settings.altegio_inbox_batch_wait_ms,
+)
+
+
+# Секрет вебхука фиксирован на время жизни процесса — кодируем один раз,
+# чтобы не ходить в pydantic settings на каждый запрос.
+_EXPECTED_SECRET = settings.altegio_webhook_secret.encode("utf-8")
+
+# Функции модулей, вызываемые на каждый вебхук, привязываем к глобальным
+# именам: одна загрузка имени вместо поиска атрибута в модуле.
+_compare_digest = hmac.compare_digest
+# Только stdlib json: orjson молча превращает целые шире 64 бит во float
+# и не принимает NaN и одиночные суррогаты, которые Altegio мог прислать.
+_json_loads = json.loads
+_json_dumps = json.dumps
+
+
+# Не сохраняем потенциально чувствительные заголовки.
+# ASGI-сервер отдаёт имена заголовков уже в нижнем регистре.
+_DENY_HEADERS = frozenset((b"authorization", b"cookie"))
+
+
+def _safe_headers(request: Request) -> dict[str, str]:
+    return {k.decode("latin-1"): v.decode("latin-1") for k, v in request.headers.raw if k not in _DENY_HEADERS}
+
+
+# Конструктор хэша привязываем один раз, без поиска атрибута в hashlib
+# на каждый вебхук.
+_sha256 = hashlib.sha256
+
+
+def _hash_hex(*parts: bytes) -> str:
+    # Формат ключа менять нельзя: Altegio повторяет доставку, и ключ
+    # повтора должен совпасть с уже сохранённым в altegio_events.
+    # Части скармливаем через update(), не склеивая в новый bytes.
+    h = _sha256()
+    for part in parts:
+        h.update(part)
+    return h.hexdigest()
+
+
+class _CoreFields(NamedTuple):
+    """Главные поля вебхука, прочитанные из payload один раз."""
+
+    company_id: Any
+    resource: Any
+    resource_id: Any
+    event_status: Any
+    last_change: Any
+
+
+def _core_fields(payload: dict[str, Any]) -> _CoreFields:
+    get = payload.get
+    return _CoreFields(
+        company_id=get("company_id"),
+        resource=get("resource"),
+        resource_id=get("resource_id"),
+        event_status=get("status"),
+        last_change=(get("data") or {}).get("last_change_date"),
+    )
+
+
+def _make_dedupe_key(payload: dict[str, Any], core: _CoreFields, secret: str | None) -> str:
+    """
+    Стабильный ключ, чтобы одинаковый вебхук не обработался дважды.
+    Берём главные поля + last_change_date (если есть), иначе хэш всего payload.
+    """
+    resource = core.resource or payload.get("type")
+
+    if core.company_id is None or resource is None or core.resource_id is None or core.event_status is None:
+        # Канонический вид должен совпадать байт в байт с уже сохранёнными
+        # ключами (в том числе запись float: 1e+16, 1.5e-07), поэтому stdlib.
+        # Двойной хэш через "fallback:<digest>" сохраняет прежний формат ключа.
+        canon = _json_dumps(payload, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+        return _hash_hex(b"fallback:", _hash_hex(canon.encode("utf-8")).encode("ascii"))
+
+    base = f"{core.company_id}:{resource}:{core.resource_id}:{core.event_status}:{core.last_change}:{secret}"
+    return _hash_hex(base.encode("utf-8"))
+
+
+@router.post("/webhooks/altegio")
+async def altegio_webhook(request: Request) -> dict[str, bool]:
+    # 1) проверяем секрет (в логах это query param 'secret').
+    # Читаем один ключ напрямую из QueryParams: запросы с неверным
+    # секретом отбиваются до любых аллокаций.
+    provided = request.query_params.get("secret")
+    if not provided or not _compare_digest(provided.encode("utf-8"), _EXPECTED_SECRET):
+        raise HTTPException(status_code=403, detail="Invalid webhook secret")
+
+    # 2) читаем payload
+    try:
+        payload = _json_loads(await request.body())
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid JSON")
+
+    # 3) сохраняем в inbox
+    core = _core_fields(payload)
+    dedupe_key = _make_dedupe_key(payload, core, provided)
+    query = dict(request.query_params)
+
+    await inbox.put(
+        {
+            "dedupe_key": dedupe_key,
+            "status": "received",
+            "company_id": core.company_id,
+            "resource": core.resource,
+            "resource_id": core.resource_id,
+            "event_status": core.event_status,
+            "query": query,
+            "headers": _safe_headers(request),
+            "payload": payload,
+        }
+    )
+
+    return {"ok": True}
@@ -279,16 +279,20 @@ async def replace_record_services(
     session: AsyncSession,
     record_pk: int,
     services: list[dict[str, Any]] | None,
-) -> None:
+) -> list[int] | None:
+    """Заменить услуги записи; вернуть записанные service_id.
+
+    None — услуги в вебхуке не пришли и в БД не менялись.
+    """
     # Если services вообще не пришли в вебхуке — ничего не трогаем.
     if services is None:
-        return
+        return None
 
     # Если пришёл пустой список — значит сервисов реально нет -> очищаем.
     await session.execute(delete(RecordService).where(RecordService.record_id == record_pk))
 
     if not services:
-        return
+        return []
 
     rows: list[dict[str, Any]] = []
     for svc in services:
@@ -311,6 +315,7 @@ async def replace_record_services(
         )
 
     await session.execute(insert(RecordService), rows)
+    return [row["service_id"] for row in rows]
 
 
 async def lock_next_batch(
@@ -333,7 +338,7 @@ async def lock_next_batch(
     return events
 
 
-async def handle_event(session: AsyncSession, event: AltegioEvent) -> None:
+async def handle_event(session: AsyncSession, event: AltegioEvent, *, now: datetime | None = None) -> None:
     payload = event.payload or {}
 
     company_id = event.company_id or payload.get("company_id")
@@ -371,7 +376,7 @@ async def handle_event(session: AsyncSession, event: AltegioEvent) -> None:
         )
 
         services_payload = data.get("services")
-        await replace_record_services(session, record_pk, services_payload)
+        service_ids = await replace_record_services(session, record_pk, services_payload)
 
         # Пропускаем события смены статуса визита (visit_attendance).
         # Альтеджио присылает update с visit_attendance != 0 когда клиент отмечен как
@@ -386,13 +391,27 @@ async def handle_event(session: AsyncSession, event: AltegioEvent) -> None:
                 )
                 return
 
+        # Статус, которого планировщик не знает, не даёт ни одной задачи —
+        # не тратим на такое событие чтение записи и проверку услуг
+        # (последняя может сходить в API Altegio).
+        if _normalize_event_status(event_status) is None:
+            logger.info(
+                "Skip planning: record_id=%s unknown status=%r",
+                record_pk,
+                event_status,
+            )
+            return
+
         record_obj = await session.get(Record, record_pk)
 
         if record_obj is not None and event_status is not None:
+            # Услуги только что записаны из payload — передаём их id,
+            # чтобы не перечитывать record_services из БД.
             allowed = await record_has_allowed_service(
                 session=session,
                 company_id=int(record_obj.company_id),
                 record_id=int(record_obj.id),
+                service_ids=service_ids,
             )
             if not allowed:
                 logger.info(
@@ -408,6 +427,7 @@ async def handle_event(session: AsyncSession, event: AltegioEvent) -> None:
                 record_id=int(record_obj.id),
                 status=str(event_status),
                 source_cancelled_at=_resolve_source_cancelled_at(event, payload, event_status),
+                now=now,
             )
 
         return
@@ -431,14 +451,16 @@ async def process_one_event(event_id: int) -> None:
                     resource_id=event.resource_id,
                 )
 
+                # Одно чтение часов на событие: и для планировщика, и для processed_at.
+                now = utcnow()
                 try:
-                    await handle_event(session, event)
+                    await handle_event(session, event, now=now)
                     event.status = "processed"
-                    event.processed_at = utcnow()
+                    event.processed_at = now
                     event.error = None
                 except Exception as exc:
                     event.status = "failed"
-                    event.processed_at = utcnow()
+                    event.processed_at = now
                     event.error = str(exc)
                     logger.exception("Event failed id=%s", event_id)
 
@@ -464,6 +486,10 @@ async def run_loop(batch_size: int = 50, poll_sec: float = 1.0) -> None:
             await asyncio.sleep(poll_sec)
             continue
 
+        # Строго по очереди: проверка comeback_3d в планировщике видит только
+        # закоммиченные задачи, поэтому два события одного клиента нельзя
+        # обрабатывать одновременно. Клиента в payload часто нет (delete),
+        # так что надёжно сгруппировать события заранее не получится.
         for eid in event_ids:
             await process_one_event(eid)
 
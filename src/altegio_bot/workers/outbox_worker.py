@@ -8,8 +8,9 @@ from decimal import Decimal
 from typing import Any
 from zoneinfo import ZoneInfo
 
-from sqlalchemy import or_, select, text, update
+from sqlalchemy import Integer, bindparam, or_, select, text, update
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, load_only
 
 from altegio_bot.altegio_records import (
     client_has_any_future_record,
@@ -61,27 +62,35 @@ MIN_SECONDS_BETWEEN_MESSAGES = 30
 DEFAULT_LANGUAGE = "de"
 PAST_RECORD_GRACE_MINUTES = 5
 
-PRE_APPOINTMENT_JOB_TYPES = (
-    "record_created",
-    "record_updated",
-    "reminder_24h",
-    "reminder_2h",
+# Наборы типов задач проверяются только через `in` на каждую задачу —
+# держим их frozenset'ами.
+PRE_APPOINTMENT_JOB_TYPES: frozenset[str] = frozenset(
+    (
+        "record_created",
+        "record_updated",
+        "reminder_24h",
+        "reminder_2h",
+    )
 )
 
-MARKETING_JOB_TYPES = (
-    "review_3d",
-    "repeat_10d",
-    "comeback_3d",
-    "newsletter_new_clients_monthly",
-    "newsletter_new_clients_followup",
+MARKETING_JOB_TYPES: frozenset[str] = frozenset(
+    (
+        "review_3d",
+        "repeat_10d",
+        "comeback_3d",
+        "newsletter_new_clients_monthly",
+        "newsletter_new_clients_followup",
+    )
 )
 
-WA_131026_SUPPRESSIBLE_JOB_TYPES: tuple[str, ...] = (
-    "review_3d",
-    "repeat_10d",
-    "comeback_3d",
-    "newsletter_new_clients_monthly",
-    "newsletter_new_clients_followup",
+WA_131026_SUPPRESSIBLE_JOB_TYPES: frozenset[str] = frozenset(
+    (
+        "review_3d",
+        "repeat_10d",
+        "comeback_3d",
+        "newsletter_new_clients_monthly",
+        "newsletter_new_clients_followup",
+    )
 )
 
 TOKEN_EXPIRED_RETRY_SECONDS = 60
@@ -332,22 +341,27 @@ def _fmt_time(dt: datetime | None) -> str:
     return dt.astimezone(tz).strftime("%H:%M")
 
 
+# Выборка due-задач: строится один раз, now и лимит приходят параметрами,
+# так что каждый тик воркера попадает в кеш скомпилированных запросов
+# без пересборки выражения.
+_DUE_JOBS_STMT = (
+    select(MessageJob)
+    .where(MessageJob.status == "queued")
+    .where(MessageJob.job_type != CAMPAIGN_EXECUTION_JOB_TYPE)
+    .where(MessageJob.run_at <= bindparam("now"))
+    .order_by(MessageJob.run_at.asc())
+    .limit(bindparam("batch_size", type_=Integer))
+    .with_for_update(skip_locked=True)
+)
+
+
 async def _lock_next_jobs(
     session: AsyncSession,
     batch_size: int,
 ) -> list[MessageJob]:
     now = utcnow()
 
-    stmt = (
-        select(MessageJob)
-        .where(MessageJob.status == "queued")
-        .where(MessageJob.job_type != CAMPAIGN_EXECUTION_JOB_TYPE)
-        .where(MessageJob.run_at <= now)
-        .order_by(MessageJob.run_at.asc())
-        .limit(batch_size)
-        .with_for_update(skip_locked=True)
-    )
-    res = await session.execute(stmt)
+    res = await session.execute(_DUE_JOBS_STMT, {"now": now, "batch_size": batch_size})
     jobs = list(res.scalars().all())
 
     for job in jobs:
@@ -427,7 +441,9 @@ async def _load_record(
 ) -> Record | None:
     if job.record_id is None:
         return None
-    return await session.get(Record, job.record_id)
+    # Клиента записи берём тем же запросом: _load_client потом найдёт
+    # его в identity map, без отдельного SELECT.
+    return await session.get(Record, job.record_id, options=(joinedload(Record.client),))
 
 
 def _as_utc(dt: datetime) -> datetime:
@@ -688,8 +704,13 @@ async def _render_message(
     total_cost = Decimal("0.00")
 
     if record is not None:
+        # Для текста нужны только название и цена: raw (JSONB с полным
+        # payload услуги) не тянем и не декодируем.
         svc_stmt = (
-            select(RecordService).where(RecordService.record_id == record.id).order_by(RecordService.service_id.asc())
+            select(RecordService)
+            .options(load_only(RecordService.title, RecordService.cost_to_pay))
+            .where(RecordService.record_id == record.id)
+            .order_by(RecordService.service_id.asc())
         )
         svc_res = await session.execute(svc_stmt)
         services = list(svc_res.scalars().all())